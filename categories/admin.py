@@ -1,18 +1,81 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.urls import path
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from django.db.models import Count
 from .models import Category
+from .views import admin_tree_children, admin_tree_search, admin_tree_view
+
+# Below this many rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_THRESHOLD = 10_000
+# Deepest level offered as its own filter choice
+FILTER_MAX_DEPTH = 5
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate from pg_class for the unfiltered
+    changelist instead of COUNT(*) over the whole table. Filtered and
+    searched lists (and other backends) still count exactly.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if connection.vendor == 'postgresql' and query is not None and not query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [query.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # -1 until the table has been analyzed once
+            if row and row[0] >= EXACT_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class TreeLevelFilter(admin.SimpleListFilter):
+    """Roots / non-roots / depth, from the indexed depth column."""
+    title = 'tree level'
+    parameter_name = 'level'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('root', 'Root'),
+            ('child', 'Not root'),
+            *((str(depth), f'Depth {depth}') for depth in range(1, FILTER_MAX_DEPTH + 1)),
+            ('deeper', f'Deeper than {FILTER_MAX_DEPTH}'),
+        ]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == 'root':
+            return queryset.filter(depth=0)
+        if value == 'child':
+            return queryset.filter(depth__gt=0)
+        if value == 'deeper':
+            return queryset.filter(depth__gt=FILTER_MAX_DEPTH)
+        if value and value.isdigit():
+            return queryset.filter(depth=int(value))
+        return queryset
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     # 1. OPTIMIZED LIST VIEW
-    list_display = ('name_with_uuid', 'parent_link', 'similarity_count', 'is_root')
+    list_display = ('name_with_uuid', 'parent_link', 'depth', 'child_count', 'similarity_count', 'is_root')
     list_select_related = ('parent',)  # Prevents N+1 queries for parents
     
     # 2. SEARCH & FILTERING (Critical for UUIDs)
-    # Allows pasting a full UUID or typing a name
-    search_fields = ('id', 'name')
-    list_filter = ('parent',) # Simple filter to find roots (parent=None)
+    # Allows pasting a full UUID or typing a name (trigram-indexed on PostgreSQL)
+    search_fields = ('name',)
+    list_filter = (TreeLevelFilter,) # No FK choice list: 200k parents would all render
+
+    # Estimated total, and no second COUNT(*) for "N total"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     # 3. PERFORMANCE WIDGETS (The Anti-Crash Fix)
     # Uses AJAX to search for parents/similarities instead of loading 200k items
@@ -22,14 +85,27 @@ class CategoryAdmin(admin.ModelAdmin):
     # You cannot edit a UUID once created
     readonly_fields = ('id', 'created_display')
 
-    # --- CUSTOM COLUMNS ---
+    def get_search_results(self, request, queryset, search_term):
+        unsearched = queryset
+        queryset, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        if term.isdigit():
+            # An id is an exact primary key hit, not a text scan
+            queryset |= unsearched.filter(pk=int(term))
+        return queryset, may_have_duplicates
+
+    # 5. LAZY TREE DIAGRAM (linked from the changelist)
+    def get_urls(self):
+        tree_urls = [
+            path('tree/', self.admin_site.admin_view(admin_tree_view), name='categories_category_tree'),
+            path('tree/children/', self.admin_site.admin_view(admin_tree_children),
+                 name='categories_category_tree_children'),
+            path('tree/search/', self.admin_site.admin_view(admin_tree_search),
+                 name='categories_category_tree_search'),
+        ]
+        return tree_urls + super().get_urls()
 
-    def get_queryset(self, request):
-        """
-        Annotate count efficiently so we can sort by 'popularity' (connections)
-        """
-        qs = super().get_queryset(request)
-        return qs.annotate(sim_count=Count('similar_categories'))
+    # --- CUSTOM COLUMNS ---
 
     @admin.display(description="Category (UUID)", ordering='name')
     def name_with_uuid(self, obj):
@@ -51,10 +127,10 @@ class CategoryAdmin(admin.ModelAdmin):
             obj.parent.name
         )
 
-    @admin.display(description="Similar Links", ordering='sim_count')
+    @admin.display(description="Similar Links", ordering='similar_count')
     def similarity_count(self, obj):
-        """Shows count of edges. Click to view the raw list."""
-        count = obj.sim_count
+        """Shows count of edges (stored counter, sortable by 'popularity')."""
+        count = obj.similar_count
         if count > 100:
             style = "color: red; font-weight: bold;"
         elif count > 0:
@@ -0,0 +1,170 @@
+"""
+Async (ASGI) versions of the read-heavy category endpoints.
+
+Same payloads as the DRF views, mounted under /api/async/. They query
+through Django's async ORM and push CPU-bound work (forest assembly,
+JSON encoding, the path BFS) to worker threads, so under an ASGI worker
+(uvicorn, see entrypoint.sh) a slow tree or path request waits without
+holding a process: many concurrent reads share a few workers.
+
+DRF has no async views, hence plain Django views returning JsonResponse.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import aget_cached_tree, aget_tree_version, aset_cached_tree, tree_etag
+from .graph import PathSearchTimeout
+from .models import Category
+from .renderers import ORJSONRenderer
+from .serializers import DETAIL_FIELDS, LIST_FIELDS, detail_row, list_rows
+from .views import TREE_FIELDS, build_forest, find_similarity_path
+
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 1000
+
+
+def _error(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+def _render_forest(rows):
+    return ORJSONRenderer().render(build_forest(rows))
+
+
+def _render_subtree(rows):
+    return ORJSONRenderer().render(build_forest(rows)[0])
+
+
+def _find_path(*args):
+    # An executor thread has its own DB connection; hand it back (to the
+    # pool, when DB_POOL is on) instead of keeping one open per thread
+    try:
+        return find_similarity_path(*args)
+    finally:
+        connection.close()
+
+
+async def _get_object(pk):
+    try:
+        return await Category.objects.aget(pk=pk)
+    except Category.DoesNotExist:
+        raise Http404
+
+
+@require_GET
+async def category_list(request):
+    """
+    Keyset-paged list, same rows and {next, previous, results} shape as
+    the DRF list with ?pagination=cursor. The links carry the boundary id
+    (?after= / ?before=) instead of an opaque cursor, and there is no
+    page-number mode (hence no count).
+    """
+    try:
+        after = int(request.GET.get('after', 0))
+        before = int(request.GET['before']) if request.GET.get('before') else None
+        page_size = min(int(request.GET.get('page_size', LIST_PAGE_SIZE)), LIST_MAX_PAGE_SIZE)
+        if page_size < 1:
+            raise ValueError
+    except ValueError:
+        return _error("after, before and page_size must be integers, page_size at least 1.", 400)
+
+    queryset = Category.objects.values(*LIST_FIELDS)
+    if before is None:
+        rows = [row async for row in queryset.filter(id__gt=after).order_by('id')[:page_size + 1]]
+        more_after, more_before = len(rows) > page_size, after > 0
+        rows = rows[:page_size]
+    else:
+        rows = [row async for row in queryset.filter(id__lt=before).order_by('-id')[:page_size + 1]]
+        more_after, more_before = True, len(rows) > page_size
+        rows = rows[:page_size][::-1]
+
+    url = request.build_absolute_uri()
+    next_url = previous_url = None
+    if rows and more_after:
+        next_url = replace_query_param(remove_query_param(url, 'before'), 'after', rows[-1]['id'])
+    if rows and more_before:
+        previous_url = replace_query_param(remove_query_param(url, 'after'), 'before', rows[0]['id'])
+    return JsonResponse({'next': next_url, 'previous': previous_url, 'results': list_rows(rows)})
+
+
+@require_GET
+async def category_detail(request, pk):
+    try:
+        row = await Category.objects.values(*DETAIL_FIELDS).aget(pk=pk)
+    except Category.DoesNotExist:
+        raise Http404
+    return JsonResponse(detail_row(row, request))
+
+
+@require_GET
+async def category_tree(request):
+    """Versioned cache and ETag exactly like CategoryViewSet.tree."""
+    version = await aget_tree_version()
+    etag = tree_etag(version)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    payload = await aget_cached_tree(version)
+    if payload is None:
+        rows = [row async for row in Category.objects.values(*TREE_FIELDS)]
+        payload = await sync_to_async(_render_forest, thread_sensitive=False)(rows)
+        await aset_cached_tree(version, payload)
+
+    response = HttpResponse(payload, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@require_GET
+async def category_subtree(request, pk):
+    category = await _get_object(pk)
+    queryset = Category.objects.descendants_of(category, include_self=True)
+
+    depth = request.GET.get('depth')
+    if depth is not None:
+        try:
+            depth = int(depth)
+            if depth < 0:
+                raise ValueError
+        except ValueError:
+            return _error("depth must be a non-negative integer.", 400)
+        queryset = queryset.filter(depth__lte=category.depth + depth)
+
+    rows = [row async for row in queryset.values(*TREE_FIELDS)]
+    payload = await sync_to_async(_render_subtree, thread_sensitive=False)(rows)
+    return HttpResponse(payload, content_type='application/json')
+
+
+@require_GET
+async def category_path(request, pk, target):
+    source = (await _get_object(pk)).pk
+    target = (await _get_object(target)).pk
+    try:
+        max_hops = min(int(request.GET.get('max_hops', settings.PATH_MAX_HOPS)), settings.PATH_MAX_HOPS)
+        timeout = min(float(request.GET.get('timeout', settings.PATH_QUERY_TIMEOUT)), settings.PATH_QUERY_TIMEOUT)
+    except ValueError:
+        return _error("max_hops and timeout must be numbers.", 400)
+
+    # Off the shared sync thread: a 12-hop BFS there would stall every
+    # other sync_to_async call in the process
+    try:
+        path = await sync_to_async(_find_path, thread_sensitive=False)(source, target, max_hops, timeout)
+    except PathSearchTimeout:
+        return _error(f"No path found within {timeout}s.", 504)
+    if path is None:
+        return _error(f"No path within {max_hops} hops.", 404)
+
+    names = {nid: name async for nid, name in Category.objects.filter(pk__in=path).values_list('id', 'name')}
+    return JsonResponse({
+        "hops": len(path) - 1,
+        "path": [{"id": nid, "name": names.get(nid)} for nid in path],
+    })
@@ -0,0 +1,275 @@
+"""
+Reproducible benchmarks over synthetic similarity graphs.
+
+The topologies of the stress_test_rabbits / case_every_to_every /
+case_edge commands, but seeded and sized by parameters, emitted as
+import records (see bulk.py) and loaded through import_forest(). Each
+scenario times one hot path through the real URLs with the test client,
+so routing, serialization and middleware are included.
+
+Used by `manage.py benchmark` (JSON report) and by the pytest-benchmark
+suite in tests/test_benchmarks.py.
+"""
+import io
+import itertools
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from .bulk import import_forest
+from .cache import bump_similarity_version, bump_tree_version
+from .models import Category
+from .renderers import ORJSONRenderer
+from .serializers import DETAIL_FIELDS, CategoryDetailSerializer, detail_row
+
+# Categories per run of the serialize_* scenarios
+SERIALIZE_SAMPLE = 1000
+
+TABLES = (
+    'categories_category_similar_categories',
+    'categories_categorycomponent',
+    'categories_similaritycomponent',
+    'categories_similaritydirtynode',
+    'categories_categorychange',
+    'categories_category',
+)
+
+
+# --- Topologies: yield import_forest() records ---
+
+def random_tree(seed, size, links):
+    """stress_test_rabbits: level-order tree (1-3 children each), random links."""
+    rng = random.Random(seed)
+    roots = max(1, size // 40)
+    for key in range(roots):
+        yield 'n', str(key), None, f"Root_{key}", None
+    level, created = list(range(roots)), roots
+    while created < size and level:
+        next_level = []
+        for parent in level:
+            for _ in range(rng.randint(1, 3)):
+                if created >= size:
+                    break
+                yield 'n', str(created), str(parent), f"Cat_{created}", None
+                next_level.append(created)
+                created += 1
+        level = next_level
+
+    pairs = set()
+    links = min(links, size * (size - 1) // 2) if size > 1 else 0
+    while len(pairs) < links:
+        a, b = rng.sample(range(size), 2)
+        pairs.add((min(a, b), max(a, b)))
+    for a, b in sorted(pairs):
+        yield 'e', str(a), str(b), None, None
+
+
+def complete_graph(seed, size, links):
+    """case_every_to_every: `size` flat nodes, every pair linked."""
+    for key in range(size):
+        yield 'n', str(key), None, f"Node_{key}", None
+    for a, b in itertools.combinations(range(size), 2):
+        yield 'e', str(a), str(b), None, None
+
+
+def star_and_snake(seed, size, links):
+    """case_edge: a star of `size` satellites beside a snake of size/100 nodes."""
+    snake = max(2, size // 100)
+    yield 'n', 'center', None, "Star_Center", None
+    for i in range(size):
+        yield 'n', f'sat{i}', None, f"Sat_{i}", None
+        yield 'e', 'center', f'sat{i}', None, None
+    for i in range(snake):
+        yield 'n', f'snake{i}', None, f"Snake_{i}", None
+        if i:
+            yield 'e', f'snake{i - 1}', f'snake{i}', None, None
+
+
+TOPOLOGIES = {
+    'random': random_tree,
+    'complete': complete_graph,
+    'star': star_and_snake,
+}
+
+
+def reset_tables():
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"TRUNCATE TABLE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        else:
+            for table in TABLES:
+                cursor.execute(f"DELETE FROM {table}")
+    bump_tree_version()
+    bump_similarity_version()
+
+
+def load_topology(topology, seed=0, size=2000, links=20000):
+    """Wipes the category tables and loads a generated graph. Returns import stats."""
+    reset_tables()
+    stats = import_forest(TOPOLOGIES[topology](seed, size, links))
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE categories_category, categories_category_similar_categories")
+    return stats
+
+
+# --- Scenarios: one call = one timed operation ---
+
+class Scenarios:
+    """
+    Hot paths against the loaded graph. Every scenario draws its
+    arguments from its own seeded generator, so runs are repeatable.
+    """
+
+    def __init__(self, seed=0):
+        self.client = Client()
+        self.ids = list(Category.objects.order_by('id').values_list('id', flat=True))
+        self.roots = list(Category.objects.filter(parent__isnull=True).order_by('id').values_list('id', flat=True))
+        self.linked = list(
+            Category.objects.filter(similar_count__gt=0).order_by('id').values_list('id', flat=True)
+        ) or self.ids
+        self.rng = {name: random.Random(f"{seed}:{name}") for name in SCENARIOS}
+        # Rows for the serialize_* scenarios, fetched once so only the
+        # Python side is timed
+        self.request = RequestFactory().get('/')
+        self.sample = list(Category.objects.order_by('id')[:SERIALIZE_SAMPLE])
+        self.sample_rows = list(Category.objects.order_by('id').values(*DETAIL_FIELDS)[:SERIALIZE_SAMPLE])
+        # Separate wrapper, so `connect` never closes the suite's connection
+        self.connection = connections.create_connection(DEFAULT_DB_ALIAS)
+
+    def _get(self, url, data=None):
+        response = self.client.get(url, data)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def tree_build(self):
+        # A new version forces a rebuild instead of a cache hit
+        bump_tree_version()
+        return self._get(reverse('category-tree'))
+
+    def tree_cached(self):
+        return self._get(reverse('category-tree'))
+
+    def list_first_page(self):
+        return self._get(reverse('category-list'))
+
+    def list_deep_page(self):
+        # Page-number pagination halfway through the table (50 per page)
+        return self._get(reverse('category-list'), {'page': max(1, len(self.ids) // 100)})
+
+    def move(self):
+        rng = self.rng['move']
+        node = rng.choice(self.ids)
+        target = rng.choice([root for root in self.roots[:50] if root != node] or [None])
+        return self.client.patch(
+            reverse('category-move', kwargs={'pk': node}),
+            {'parent_id': target}, content_type='application/json',
+        )
+
+    def similarity_add(self):
+        a, b = self.rng['similarity_add'].sample(self.ids, 2)
+        return self.client.post(
+            reverse('category-similarity', kwargs={'pk': a}),
+            {'target_id': b}, content_type='application/json',
+        )
+
+    def path(self):
+        a, b = self.rng['path'].sample(self.linked, 2)
+        return self._get(reverse('category-path', kwargs={'pk': a, 'target': b}))
+
+    def serialize_model(self):
+        # Before: ModelSerializer per instance + DRF's JSONRenderer
+        data = CategoryDetailSerializer(self.sample, many=True, context={'request': self.request}).data
+        JSONRenderer().render(data)
+        return None
+
+    def serialize_values(self):
+        # After: values() rows + orjson, what list/retrieve do now
+        ORJSONRenderer().render([detail_row(row, self.request) for row in self.sample_rows])
+        return None
+
+    def connect(self):
+        # The connection handling of one request under the current settings:
+        # close_old_connections() at request start and end around a query.
+        # Reconnects every time with CONN_MAX_AGE=0, borrows from DB_POOL,
+        # reuses (after a health check) with persistent connections.
+        self.connection.close_if_unusable_or_obsolete()
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        self.connection.close_if_unusable_or_obsolete()
+        return None
+
+    def analyze_rabbits(self):
+        call_command('analyze_rabbits', '--full', stdout=io.StringIO())
+        return None
+
+
+SCENARIOS = (
+    'tree_build', 'tree_cached', 'list_first_page', 'list_deep_page',
+    'move', 'similarity_add', 'path', 'serialize_model', 'serialize_values',
+    'connect', 'analyze_rabbits',
+)
+
+
+def check(name, response):
+    """A scenario that errors would time the error page; fail loudly instead."""
+    if response is not None and response.status_code >= 500:
+        raise RuntimeError(f"{name}: HTTP {response.status_code}")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(topology, seed=0, size=2000, links=20000, repeat=5, scenarios=SCENARIOS):
+    """Loads the topology, times each scenario `repeat` times (after one warm-up)."""
+    load_start = time.perf_counter()
+    stats = load_topology(topology, seed=seed, size=size, links=links)
+    report = {
+        'topology': topology,
+        'seed': seed,
+        'size': size,
+        'links': links,
+        'loaded': {**stats, 'seconds': round(time.perf_counter() - load_start, 6)},
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'connections': {
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+            'pool': connection.settings_dict['OPTIONS'].get('pool', False),
+        },
+        'results': {},
+    }
+
+    runner = Scenarios(seed)
+    for name in scenarios:
+        scenario = getattr(runner, name)
+        check(name, scenario())
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scenario()
+            timings.append(time.perf_counter() - start)
+        report['results'][name] = {
+            'runs': repeat,
+            'min': round(min(timings), 6),
+            'median': round(statistics.median(timings), 6),
+            'mean': round(statistics.fmean(timings), 6),
+            'max': round(max(timings), 6),
+        }
+    return report
@@ -0,0 +1,429 @@
+"""
+Set-based bulk writers: similarity links and whole-forest import/export.
+
+Input is streamed into a temp table (COPY on PostgreSQL, batched
+executemany elsewhere) and applied with a handful of INSERT/DELETE ...
+SELECT statements, instead of an ORM round trip per row. Signals do not
+fire here, so the tree/similarity versions and the analytics dirty marks
+are maintained explicitly.
+
+Forest format, one record per line. NDJSON:
+
+    {"key": "1", "parent": null, "name": "Root", "description": "..."}
+    {"key": "2", "parent": "1", "name": "Child", "description": null}
+    {"source": "1", "target": "2"}
+
+CSV, with a header row; `ref` is the parent key for categories and the
+target key for similarity links:
+
+    kind,key,ref,name,description
+    category,1,,Root,...
+    category,2,1,Child,
+    similar,1,2,,
+
+Keys are opaque strings local to the file (export uses the ids). Records
+may come in any order; parents are resolved in SQL after loading.
+"""
+import csv
+import io
+import json
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from .cache import bump_similarity_version, bump_tree_version
+from .models import Category
+
+EDGE_TABLE = 'categories_category_similar_categories'
+CATEGORY_TABLE = 'categories_category'
+DIRTY_TABLE = 'categories_similaritydirtynode'
+# Rows per executemany() on backends without COPY
+BATCH_SIZE = 5000
+
+
+class IteratorFile(io.TextIOBase):
+    """Read-only file over an iterator of strings, for psycopg2's copy_from()."""
+
+    def __init__(self, iterator):
+        self._iter = iterator
+        self._buff = ''
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        while n is None or n < 0 or len(self._buff) < n:
+            try:
+                self._buff += next(self._iter)
+            except StopIteration:
+                break
+        if n is None or n < 0:
+            ret, self._buff = self._buff, ''
+        else:
+            ret, self._buff = self._buff[:n], self._buff[n:]
+        return ret
+
+    def readline(self, *args):
+        return self.read()
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Loads `rows` (tuples) into `table`: COPY from a streamed buffer on
+    PostgreSQL, batched executemany elsewhere. Constant memory either way.
+    """
+    if connection.vendor == 'postgresql':
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        if is_psycopg3:
+            with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            lines = ('\t'.join(_copy_value(v) for v in row) + '\n' for row in rows)
+            cursor.copy_from(IteratorFile(lines), table, columns=columns)
+        return
+
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+def copy_links(cursor, pairs):
+    """
+    Loads similarity `pairs` (each unordered pair once) with copy_rows, in
+    both directions: the through-table layout Django's symmetrical M2M
+    writes and every reader and counter trigger relies on.
+    """
+    rows = (row for a, b in pairs for row in ((a, b), (b, a)))
+    copy_rows(cursor, EDGE_TABLE, ('from_category_id', 'to_category_id'), rows)
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def parse_pairs(lines, fmt='ndjson'):
+    """
+    Yields (a, b) with a < b for each line of NDJSON ({"source": a,
+    "target": b} or [a, b]) or CSV ("a,b"), and None for lines that cannot
+    be a link (malformed, self-links). A non-numeric first CSV row is
+    taken as a header.
+    """
+    lines = (line.decode('utf-8') if isinstance(line, bytes) else line for line in lines)
+    if fmt == 'csv':
+        rows = csv.reader(lines)
+        for number, row in enumerate(rows):
+            if not row:
+                continue
+            try:
+                yield _pair(row[0], row[1])
+            except (IndexError, ValueError):
+                if number == 0:
+                    continue
+                yield None
+        return
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            if isinstance(item, dict):
+                item = (item['source'], item['target'])
+            yield _pair(*item)
+        except (ValueError, TypeError, KeyError):
+            yield None
+
+
+def _pair(a, b):
+    a, b = int(a), int(b)
+    if a == b:
+        raise ValueError("self-link")
+    return (a, b) if a < b else (b, a)
+
+
+def apply_similarity_pairs(pairs, unlink=False):
+    """
+    Links (or unlinks) every pair in both directions. Returns counts:
+    added/removed (pairs actually changed), skipped (already in that state
+    or repeated) and rejected (malformed, self-links, unknown ids).
+    """
+    stats = {'rejected': 0}
+
+    def valid_rows():
+        for pair in pairs:
+            if pair is None:
+                stats['rejected'] += 1
+            else:
+                yield pair
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS bulk_pairs")
+        cursor.execute("DROP TABLE IF EXISTS bulk_changed")
+        cursor.execute("CREATE TEMP TABLE bulk_pairs (a BIGINT, b BIGINT)")
+        copy_rows(cursor, 'bulk_pairs', ('a', 'b'), valid_rows())
+
+        # Rows naming a category that does not exist
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM bulk_pairs p
+            WHERE NOT EXISTS (SELECT 1 FROM {CATEGORY_TABLE} c WHERE c.id = p.a)
+               OR NOT EXISTS (SELECT 1 FROM {CATEGORY_TABLE} c WHERE c.id = p.b)
+        """)
+        unknown = cursor.fetchone()[0]
+        stats['rejected'] += unknown
+        cursor.execute("SELECT COUNT(*) FROM bulk_pairs")
+        known = cursor.fetchone()[0] - unknown
+
+        # Distinct known pairs whose state actually changes: a link that is
+        # missing in either direction, or one that exists for unlink.
+        missing = "EXISTS" if unlink else "NOT EXISTS"
+        cursor.execute(f"""
+            CREATE TEMP TABLE bulk_changed AS
+            SELECT DISTINCT p.a, p.b FROM bulk_pairs p
+            JOIN {CATEGORY_TABLE} ca ON ca.id = p.a
+            JOIN {CATEGORY_TABLE} cb ON cb.id = p.b
+            WHERE {missing} (SELECT 1 FROM {EDGE_TABLE} e
+                             WHERE e.from_category_id = p.a AND e.to_category_id = p.b)
+               OR {missing} (SELECT 1 FROM {EDGE_TABLE} e
+                             WHERE e.from_category_id = p.b AND e.to_category_id = p.a)
+        """)
+        cursor.execute("SELECT COUNT(*) FROM bulk_changed")
+        changed = cursor.fetchone()[0]
+
+        both_directions = "SELECT a, b FROM bulk_changed UNION ALL SELECT b, a FROM bulk_changed"
+        if unlink:
+            cursor.execute(f"""
+                DELETE FROM {EDGE_TABLE}
+                WHERE (from_category_id, to_category_id) IN ({both_directions})
+            """)
+        else:
+            # `WHERE true` keeps SQLite from reading ON CONFLICT as a join
+            cursor.execute(f"""
+                INSERT INTO {EDGE_TABLE} (from_category_id, to_category_id)
+                SELECT a, b FROM ({both_directions}) AS d WHERE true
+                ON CONFLICT DO NOTHING
+            """)
+
+        # Keep incremental analyze_rabbits and the snapshot in step
+        cursor.execute(f"""
+            INSERT INTO {DIRTY_TABLE} (category_id)
+            SELECT id FROM (SELECT a AS id FROM bulk_changed UNION SELECT b FROM bulk_changed) AS d
+            WHERE true ON CONFLICT DO NOTHING
+        """)
+        cursor.execute("DROP TABLE bulk_pairs")
+        cursor.execute("DROP TABLE bulk_changed")
+        transaction.on_commit(bump_similarity_version)
+
+    stats['removed' if unlink else 'added'] = changed
+    stats['skipped'] = known - changed
+    return stats
+
+
+CSV_HEADER = ('kind', 'key', 'ref', 'name', 'description')
+
+
+def parse_records(lines, fmt='ndjson'):
+    """
+    Yields (kind, key, ref, name, description) staging rows, kind being
+    'n' (category) or 'e' (similarity link), and None for bad lines.
+    """
+    lines = (line.decode('utf-8') if isinstance(line, bytes) else line for line in lines)
+    if fmt == 'csv':
+        for row in csv.DictReader(lines):
+            kind = {'category': 'n', 'similar': 'e'}.get(row.get('kind'))
+            yield _record(kind, row.get('key'), row.get('ref'), row.get('name'), row.get('description'))
+        return
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            yield None
+            continue
+        if not isinstance(item, dict):
+            yield None
+        elif 'source' in item:
+            yield _record('e', item.get('source'), item.get('target'))
+        else:
+            yield _record('n', item.get('key'), item.get('parent'), item.get('name'), item.get('description'))
+
+
+def _record(kind, key, ref, name=None, description=None):
+    key = None if key in (None, '') else str(key)
+    ref = None if ref in (None, '') else str(ref)
+    if kind is None or key is None:
+        return None
+    if kind == 'e' and (ref is None or ref == key):
+        return None
+    if kind == 'n' and (not name or not isinstance(name, str) or len(name) > 255 or ref == key):
+        return None
+    if description is not None and not isinstance(description, str):
+        return None
+    return kind, key, ref, name or None, description or None
+
+
+def import_forest(records):
+    """
+    Loads categories and similarity links from parse_records() output in
+    one transaction. Parents are resolved by key with a recursive CTE that
+    also computes path/depth, so nodes are inserted once, fully formed.
+    Records with duplicate keys (after the first), unknown parents, parent
+    cycles or unknown link ends are rejected.
+    """
+    stats = {'rejected': 0}
+
+    def staged_rows():
+        for line, record in enumerate(records, start=1):
+            if record is None:
+                stats['rejected'] += 1
+            else:
+                yield (line, *record)
+
+    table = Category._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        for name in ('import_rows', 'import_tree'):
+            cursor.execute(f"DROP TABLE IF EXISTS {name}")
+        cursor.execute("""
+            CREATE TEMP TABLE import_rows (
+                line BIGINT, kind CHAR(1), key TEXT, ref TEXT,
+                name TEXT, description TEXT, id BIGINT
+            )
+        """)
+        copy_rows(cursor, 'import_rows', ('line', 'kind', 'key', 'ref', 'name', 'description'), staged_rows())
+        cursor.execute("CREATE INDEX import_rows_key ON import_rows (key, line)")
+        cursor.execute("CREATE INDEX import_rows_ref ON import_rows (ref)")
+        # Temp tables are never auto-analyzed; without statistics the
+        # planner guesses badly for the self-joins below at 1M rows
+        cursor.execute("ANALYZE import_rows")
+        cursor.execute("SELECT kind, COUNT(*) FROM import_rows GROUP BY kind")
+        staged = dict(cursor.fetchall())
+
+        # First record wins for a repeated key
+        cursor.execute("""
+            DELETE FROM import_rows WHERE kind = 'n' AND EXISTS (
+                SELECT 1 FROM import_rows f
+                WHERE f.key = import_rows.key AND f.line < import_rows.line AND f.kind = 'n'
+            )
+        """)
+
+        # Ids up front, so the CTE can build paths from them
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"""
+                UPDATE import_rows SET id = nextval(pg_get_serial_sequence('{table}', 'id'))
+                WHERE kind = 'n'
+            """)
+        else:
+            cursor.execute(f"""
+                UPDATE import_rows SET id = line + (SELECT COALESCE(MAX(id), 0) FROM {table})
+                WHERE kind = 'n'
+            """)
+
+        # Walks down from the roots, so orphans and cycles are never reached
+        cursor.execute("""
+            CREATE TEMP TABLE import_tree AS
+            WITH RECURSIVE tree(key, id, parent_id, path, depth, name, description) AS (
+                SELECT key, id, CAST(NULL AS BIGINT), CAST('/' AS TEXT), 0, name, description
+                FROM import_rows WHERE kind = 'n' AND ref IS NULL
+                UNION ALL
+                SELECT r.key, r.id, t.id, t.path || t.id || '/', t.depth + 1, r.name, r.description
+                FROM import_rows r JOIN tree t ON r.ref = t.key
+                WHERE r.kind = 'n'
+            )
+            SELECT * FROM tree
+        """)
+        cursor.execute("CREATE INDEX import_tree_key ON import_tree (key)")
+        cursor.execute("ANALYZE import_tree")
+        cursor.execute(f"""
+            INSERT INTO {table} (id, name, description, parent_id, path, depth)
+            SELECT id, name, description, parent_id, path, depth FROM import_tree
+        """)
+        stats['categories'] = cursor.rowcount
+
+        cursor.execute("""
+            CREATE TEMP TABLE import_links AS
+            SELECT DISTINCT
+                CASE WHEN s.id < t.id THEN s.id ELSE t.id END AS a,
+                CASE WHEN s.id < t.id THEN t.id ELSE s.id END AS b
+            FROM import_rows e
+            JOIN import_tree s ON s.key = e.key
+            JOIN import_tree t ON t.key = e.ref
+            WHERE e.kind = 'e'
+        """)
+        cursor.execute("""
+            SELECT COUNT(*) FROM import_rows e
+            JOIN import_tree s ON s.key = e.key
+            JOIN import_tree t ON t.key = e.ref
+            WHERE e.kind = 'e'
+        """)
+        resolved = cursor.fetchone()[0]
+        cursor.execute(f"""
+            INSERT INTO {EDGE_TABLE} (from_category_id, to_category_id)
+            SELECT a, b FROM import_links UNION ALL SELECT b, a FROM import_links
+        """)
+        cursor.execute(f"""
+            INSERT INTO {DIRTY_TABLE} (category_id)
+            SELECT id FROM (SELECT a AS id FROM import_links UNION SELECT b FROM import_links) AS d
+            WHERE true ON CONFLICT DO NOTHING
+        """)
+        cursor.execute("SELECT COUNT(*) FROM import_links")
+        stats['links'] = cursor.fetchone()[0]
+
+        for name in ('import_rows', 'import_tree', 'import_links'):
+            cursor.execute(f"DROP TABLE {name}")
+        transaction.on_commit(bump_tree_version)
+        transaction.on_commit(bump_similarity_version)
+
+    stats['rejected'] += staged.get('n', 0) - stats['categories'] + staged.get('e', 0) - resolved
+    return stats
+
+
+def export_forest(fmt='ndjson', chunk_size=5000):
+    """
+    Yields the whole forest, then every similarity link once, as lines in
+    the parse_records() format. Categories come in path order, so parents
+    always precede their children. Both queries use server-side cursors.
+    """
+    categories = Category.objects.order_by('path', 'id').values_list(
+        'id', 'parent_id', 'name', 'description',
+    ).iterator(chunk_size=chunk_size)
+    links = Category.similar_categories.through.objects.filter(
+        from_category_id__lt=F('to_category_id'),
+    ).values_list('from_category_id', 'to_category_id').iterator(chunk_size=chunk_size)
+
+    if fmt == 'csv':
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+
+        def line(*row):
+            buf.seek(0)
+            buf.truncate()
+            writer.writerow(row)
+            return buf.getvalue()
+
+        yield line(*CSV_HEADER)
+        for pk, parent_id, name, description in categories:
+            yield line('category', pk, parent_id or '', name, description or '')
+        for source, target in links:
+            yield line('similar', source, target, '', '')
+        return
+
+    for pk, parent_id, name, description in categories:
+        yield json.dumps({
+            'key': str(pk),
+            'parent': None if parent_id is None else str(parent_id),
+            'name': name,
+            'description': description,
+        }, ensure_ascii=False) + '\n'
+    for source, target in links:
+        yield json.dumps({'source': str(source), 'target': str(target)}) + '\n'
@@ -0,0 +1,83 @@
+"""
+Version counters and the versioned cache for the rendered category tree.
+
+Every write to the hierarchy bumps a single counter (see signals.py); the
+rendered tree is stored under a key that embeds that counter, so stale
+payloads are never invalidated explicitly - they just stop being read
+and age out. The counters live in the database (CacheVersion), not the
+cache: a local-memory cache is per worker and the file backend's incr is
+a get+set, so either would let workers disagree or lose bumps. Payloads
+can stay in any backend, the version in the key keeps them honest.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import CacheVersion
+
+TREE_VERSION_KEY = 'categories:tree:version'
+# Bumped on every similarity link change; see snapshot.py
+SIMILARITY_VERSION_KEY = 'categories:similarity:version'
+
+
+def get_version(key):
+    version = CacheVersion.objects.filter(key=key).values_list('value', flat=True).first()
+    if version is None:
+        # Seed from the clock so a lost counter never reuses an old version
+        version = CacheVersion.objects.get_or_create(key=key, defaults={'value': time.time_ns()})[0].value
+    return version
+
+
+async def aget_version(key):
+    """get_version() for async views."""
+    version = await CacheVersion.objects.filter(key=key).values_list('value', flat=True).afirst()
+    if version is None:
+        version = (await CacheVersion.objects.aget_or_create(key=key, defaults={'value': time.time_ns()}))[0].value
+    return version
+
+
+def bump_version(key):
+    if not CacheVersion.objects.filter(key=key).update(value=F('value') + 1):
+        CacheVersion.objects.get_or_create(key=key, defaults={'value': time.time_ns()})
+
+
+def get_tree_version():
+    return get_version(TREE_VERSION_KEY)
+
+
+async def aget_tree_version():
+    return await aget_version(TREE_VERSION_KEY)
+
+
+def bump_tree_version():
+    bump_version(TREE_VERSION_KEY)
+
+
+def get_similarity_version():
+    return get_version(SIMILARITY_VERSION_KEY)
+
+
+def bump_similarity_version():
+    bump_version(SIMILARITY_VERSION_KEY)
+
+
+def tree_etag(version):
+    return f'"tree-{version}"'
+
+
+def get_cached_tree(version):
+    return cache.get(f'categories:tree:{version}')
+
+
+def set_cached_tree(version, payload):
+    cache.set(f'categories:tree:{version}', payload, timeout=settings.TREE_CACHE_TIMEOUT)
+
+
+async def aget_cached_tree(version):
+    return await cache.aget(f'categories:tree:{version}')
+
+
+async def aset_cached_tree(version, payload):
+    await cache.aset(f'categories:tree:{version}', payload, timeout=settings.TREE_CACHE_TIMEOUT)
@@ -0,0 +1,389 @@
+"""
+Graph engines for the similarity graph.
+
+`CSRGraph` keeps the graph as two flat NumPy arrays (compressed sparse
+rows) over dense node indices and runs BFS one whole frontier at a time,
+so a 2M-edge graph costs a few dozen MB instead of millions of Python
+dicts. `NetworkXEngine` is the original implementation, kept so the two
+can be compared with `analyze_rabbits --engine`.
+
+Both engines take the edge list as two parallel id arrays and expose the
+two calls used by analyze_rabbits: islands() and sweep().
+"""
+import multiprocessing
+import time
+from typing import NamedTuple, Optional
+
+import networkx as nx
+import numpy as np
+
+
+class IslandResult(NamedTuple):
+    start_eccentricity: int
+    # Lower bound on the diameter; exact when it equals `upper`
+    diameter: int
+    # Category ids along a shortest path of length `diameter`
+    path: list
+    # Certified upper bound (None for the plain double sweep)
+    upper: Optional[int] = None
+    bfs_runs: int = 2
+
+
+def ifub(bfs, shortest_path, start, max_bfs=None):
+    """
+    Exact diameter of one island by iFUB (Crescenzi et al., 2013).
+
+    `bfs(node)` returns (order, levels) arrays, `shortest_path(u, v)` a node
+    list. A double sweep gives the lower bound, then a BFS from the middle
+    of that path, r, splits the island into distance levels ("fringes").
+    Any two nodes above fringe i are at most 2(i - 1) apart, so fringes are
+    processed from the deepest up until the lower bound beats that, which
+    usually takes a handful of BFS runs. With `max_bfs` the search may stop
+    early, leaving lower < upper as certified bounds.
+    """
+    runs = 0
+
+    def bfs_counted(node):
+        nonlocal runs
+        runs += 1
+        return bfs(node)
+
+    order, levels = bfs_counted(start)
+    start_ecc, u = int(levels[-1]), order[-1]
+    order, levels = bfs_counted(u)
+    lower, best = int(levels[-1]), (u, order[-1])
+
+    # Rooting at the middle of the sweep path keeps the fringes shallow
+    sweep_path = shortest_path(*best)
+    root = sweep_path[len(sweep_path) // 2]
+    order, levels = bfs_counted(root)
+    order, levels = np.asarray(order), np.asarray(levels)
+    depth = int(levels[-1])
+    if depth > lower:
+        lower, best = depth, (root, order[-1])
+    upper = 2 * depth
+
+    i = depth
+    while lower < upper and i > 0:
+        for node in order[levels == i]:
+            if max_bfs is not None and runs >= max_bfs:
+                break
+            fringe_order, fringe_levels = bfs_counted(node)
+            if fringe_levels[-1] > lower:
+                lower, best = int(fringe_levels[-1]), (node, fringe_order[-1])
+        else:
+            # Whole fringe done: what is left sits within 2(i - 1) of itself
+            upper = lower if lower > 2 * (i - 1) else 2 * (i - 1)
+            i -= 1
+            continue
+        break
+
+    path = sweep_path if best == (sweep_path[0], sweep_path[-1]) else shortest_path(*best)
+    return start_ecc, lower, path, max(upper, lower), runs
+
+
+class CSRGraph:
+    """Undirected graph: neighbours of node i are indices[indptr[i]:indptr[i + 1]]."""
+
+    def __init__(self, node_ids, indptr, indices):
+        self.node_ids = node_ids      # sorted category ids, position = node index
+        self.indptr = indptr
+        self.indices = indices
+        # Scratch distance array reused by every BFS; only the entries a
+        # BFS touched are reset, so per-island cost stays O(island).
+        self._dist = np.full(len(node_ids), -1, dtype=np.int32)
+
+    @classmethod
+    def from_edges(cls, src, dst):
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        node_ids, inverse = np.unique(np.concatenate([src, dst]), return_inverse=True)
+        n = len(node_ids)
+        u, v = inverse[:len(src)], inverse[len(src):]
+
+        # Symmetrize, then drop duplicates (the M2M table already stores
+        # both directions) and self-loops
+        rows = np.concatenate([u, v])
+        cols = np.concatenate([v, u])
+        order = np.lexsort((cols, rows))
+        rows, cols = rows[order], cols[order]
+        keep = rows != cols
+        keep[1:] &= (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        rows, cols = rows[keep], cols[keep]
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        index_dtype = np.int32 if n < 2 ** 31 else np.int64
+        return cls(node_ids, indptr, cols.astype(index_dtype))
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def index_of(self, category_ids):
+        return np.searchsorted(self.node_ids, category_ids)
+
+    def neighbours(self, frontier):
+        """All neighbours of every node in `frontier`, in one gather."""
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        total = int(counts.sum())
+        if not total:
+            return self.indices[:0]
+        # Position k of the output reads indices[starts[j] + (k - first_k_of_j)]
+        shift = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return self.indices[shift + np.arange(total)]
+
+    def bfs(self, source):
+        """
+        Frontier-at-a-time BFS. Returns (order, levels): every reached node
+        index in BFS order plus its distance from `source`.
+        """
+        dist = self._dist
+        dist[source] = 0
+        frontier = np.array([source], dtype=self.indices.dtype)
+        order, levels = [frontier], [np.zeros(1, dtype=np.int32)]
+        level = 0
+        while frontier.size:
+            reached = self.neighbours(frontier)
+            reached = np.unique(reached[dist[reached] < 0])
+            if not reached.size:
+                break
+            level += 1
+            dist[reached] = level
+            order.append(reached)
+            levels.append(np.full(reached.size, level, dtype=np.int32))
+            frontier = reached
+        order = np.concatenate(order)
+        dist[order] = -1
+        return order, np.concatenate(levels)
+
+    def shortest_path(self, source, target):
+        """Node indices from source to target (same island assumed)."""
+        order, levels = self.bfs(target)
+        dist = self._dist
+        dist[order] = levels
+        try:
+            path = [source]
+            node = source
+            while node != target:
+                nbrs = self.indices[self.indptr[node]:self.indptr[node + 1]]
+                # Any neighbour one step closer to the target will do
+                node = nbrs[np.argmax(dist[nbrs] == dist[node] - 1)]
+                path.append(node)
+        finally:
+            dist[order] = -1
+        return path
+
+    def expand(self, category_ids):
+        """
+        (id, neighbour id) pairs for a frontier given as category ids - the
+        `expand` callback of bidirectional_bfs. Unknown ids have no links.
+        """
+        ids = np.asarray(list(category_ids), dtype=np.int64)
+        idx = self.index_of(ids)
+        known = idx < len(self)
+        known[known] = self.node_ids[idx[known]] == ids[known]
+        ids, idx = ids[known], idx[known]
+        counts = self.indptr[idx + 1] - self.indptr[idx]
+        neighbours = self.node_ids[self.neighbours(idx)]
+        return zip(np.repeat(ids, counts).tolist(), neighbours.tolist())
+
+    def components(self):
+        """Yields each connected island as an array of node indices."""
+        labelled = np.zeros(len(self), dtype=bool)
+        for seed in range(len(self)):
+            if labelled[seed]:
+                continue
+            order, _ = self.bfs(seed)
+            labelled[order] = True
+            yield order
+
+
+class CSREngine:
+    name = 'csr'
+
+    def __init__(self, src, dst):
+        self.graph = CSRGraph.from_edges(src, dst)
+
+    def islands(self, seeds=None):
+        """Islands as arrays of category ids; only those holding `seeds` if given."""
+        g = self.graph
+        if seeds is None:
+            return [g.node_ids[island] for island in g.components()]
+        islands = []
+        seen = np.zeros(len(g), dtype=bool)
+        seeds = np.fromiter(seeds, dtype=np.int64)
+        idx = g.index_of(seeds)
+        in_graph = idx < len(g)
+        idx, seeds = idx[in_graph], seeds[in_graph]
+        for node in idx[g.node_ids[idx] == seeds]:
+            if not seen[node]:
+                order, _ = g.bfs(node)
+                seen[order] = True
+                islands.append(g.node_ids[order])
+        return islands
+
+    def sweep(self, island, exact=False, max_bfs=None):
+        """Double-sweep BFS estimate, or the iFUB exact diameter."""
+        g = self.graph
+        source_node = g.index_of(island[0])
+
+        if exact:
+            start_ecc, lower, path, upper, runs = ifub(g.bfs, g.shortest_path, source_node, max_bfs)
+            return IslandResult(start_ecc, lower, [int(g.node_ids[n]) for n in path], upper, runs)
+
+        # Pass 1
+        order, levels = g.bfs(source_node)
+        u, start_ecc = order[-1], int(levels[-1])
+
+        # Pass 2
+        order, levels = g.bfs(u)
+        v, max_dist = order[-1], int(levels[-1])
+        path = g.shortest_path(u, v)
+        return IslandResult(start_ecc, max_dist, [int(g.node_ids[n]) for n in path])
+
+
+class NetworkXEngine:
+    name = 'networkx'
+
+    def __init__(self, src, dst):
+        self.G = nx.from_edgelist(zip(np.asarray(src).tolist(), np.asarray(dst).tolist()))
+
+    def islands(self, seeds=None):
+        if seeds is None:
+            return list(nx.connected_components(self.G))
+        islands = []
+        seen = set()
+        for node in seeds:
+            if node in self.G and node not in seen:
+                island = nx.node_connected_component(self.G, node)
+                seen |= island
+                islands.append(island)
+        return islands
+
+    def sweep(self, island, exact=False, max_bfs=None):
+        """Double-sweep BFS estimate, or the iFUB exact diameter."""
+        S = self.G.subgraph(island)
+        source_node = next(iter(island))
+
+        if exact:
+            def bfs(node):
+                # Dict comes back in BFS order
+                distances = nx.single_source_shortest_path_length(S, node)
+                return list(distances), list(distances.values())
+
+            def path(u, v):
+                return nx.shortest_path(S, source=u, target=v)
+
+            start_ecc, lower, hole, upper, runs = ifub(bfs, path, source_node, max_bfs)
+            return IslandResult(start_ecc, lower, [int(n) for n in hole], upper, runs)
+
+        # Pass 1
+        u, start_ecc = max(nx.single_source_shortest_path_length(S, source_node).items(), key=lambda x: x[1])
+
+        # Pass 2
+        distances = nx.single_source_shortest_path_length(S, u)
+        v, max_dist = max(distances.items(), key=lambda x: x[1])
+        return IslandResult(start_ecc, max_dist, nx.shortest_path(S, source=u, target=v))
+
+
+ENGINES = {engine.name: engine for engine in (CSREngine, NetworkXEngine)}
+
+
+class PathSearchTimeout(Exception):
+    pass
+
+
+def bidirectional_bfs(expand, source, target, max_hops=None, deadline=None):
+    """
+    Shortest path between two nodes, growing a BFS from each end and always
+    expanding the smaller frontier, so only ~2 * b^(d/2) nodes are touched.
+
+    `expand(nodes)` yields (node, neighbour) pairs for a whole frontier at
+    once (one query per layer when it reads the DB). Returns the node list,
+    or None when the ends are not connected within `max_hops`. Raises
+    PathSearchTimeout once time.monotonic() passes `deadline`.
+    """
+    if source == target:
+        return [source]
+
+    parents = ({source: None}, {target: None})
+    dists = ({source: 0}, {target: 0})
+    frontiers = ([source], [target])
+    hops = 0
+    while frontiers[0] and frontiers[1]:
+        if max_hops is not None and hops >= max_hops:
+            return None
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        parent, dist = parents[side], dists[side]
+        other_dist = dists[1 - side]
+
+        reached, meets = [], []
+        for node, neighbour in expand(frontiers[side]):
+            if deadline is not None and time.monotonic() > deadline:
+                raise PathSearchTimeout()
+            if neighbour in dist:
+                continue
+            parent[neighbour] = node
+            dist[neighbour] = dist[node] + 1
+            reached.append(neighbour)
+            if neighbour in other_dist:
+                meets.append(neighbour)
+        hops += 1
+
+        if meets:
+            # Finish the layer before choosing: the closest meet to the
+            # other end gives the shortest total.
+            meet = min(meets, key=other_dist.__getitem__)
+            return _join_paths(parents, meet)
+        frontiers[side][:] = reached
+    return None
+
+
+def _join_paths(parents, meet):
+    head = []
+    node = meet
+    while node is not None:
+        head.append(node)
+        node = parents[0][node]
+    head.reverse()
+    node = parents[1][meet]
+    while node is not None:
+        head.append(node)
+        node = parents[1][node]
+    return head
+
+
+# Set in the parent right before forking; workers inherit them copy-on-write,
+# so the CSR arrays are shared read-only instead of pickled per task.
+_shared_engine = None
+_shared_islands = None
+_shared_options = {}
+
+
+def _sweep_shared(position):
+    return position, _shared_engine.sweep(_shared_islands[position], **_shared_options)
+
+
+def sweep_islands(engine, islands, workers=1, **options):
+    """
+    engine.sweep(island, **options) for every island, in input order. With
+    workers > 1 the islands are spread over a forked process pool, biggest
+    first, so one huge island starts early instead of landing last on a
+    single core.
+    """
+    if workers <= 1 or len(islands) < 2:
+        return [engine.sweep(island, **options) for island in islands]
+
+    global _shared_engine, _shared_islands, _shared_options
+    _shared_engine, _shared_islands, _shared_options = engine, islands, options
+    biggest_first = sorted(range(len(islands)), key=lambda i: len(islands[i]), reverse=True)
+    results = [None] * len(islands)
+    try:
+        with multiprocessing.get_context('fork').Pool(workers) as pool:
+            for position, result in pool.imap_unordered(_sweep_shared, biggest_first, chunksize=1):
+                results[position] = result
+    finally:
+        _shared_engine = _shared_islands = None
+        _shared_options = {}
+    return results
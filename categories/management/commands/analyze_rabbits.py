@@ -1,42 +1,157 @@
-import networkx as nx
+import numpy as np
 import time
 from django.core.management.base import BaseCommand
-from django.db import connection
-from categories.models import Category
+from django.db import connection, connections, transaction
+from categories.graph import ENGINES, sweep_islands
+from categories.models import Category, CategoryComponent, SimilarityComponent, SimilarityDirtyNode
+from categories.snapshot import load_edge_arrays
+
+EDGE_TABLE = 'categories_category_similar_categories'
+# Ids per IN (...) list when walking the edge table (SQLite caps parameters)
+BATCH_SIZE = 500
+
 
 class Command(BaseCommand):
+    help = 'Finds the longest rabbit hole and stores per-island results (incremental by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every island instead of only those with changed links',
+        )
+        parser.add_argument(
+            '--engine',
+            choices=sorted(ENGINES),
+            default='csr',
+            help='Graph engine: NumPy CSR arrays (default) or networkx, for comparison',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes to spread the islands over (biggest island first)',
+        )
+        parser.add_argument(
+            '--exact',
+            action='store_true',
+            help='Certify each island\'s diameter with iFUB instead of the double-sweep estimate',
+        )
+        parser.add_argument(
+            '--max-bfs',
+            type=int,
+            default=None,
+            help='With --exact: BFS budget per island; stop early with certified bounds',
+        )
+
     def handle(self, *args, **options):
         start_time = time.time()
+        self.verbosity = options['verbosity']
+        engine_class = ENGINES[options['engine']]
 
-        # 1. Load Graph (Streamed)
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT from_category_id, to_category_id FROM categories_category_similar_categories")
-            G = nx.from_edgelist(cursor.fetchall())
-
-        # 2. Identify Islands
-        islands = list(nx.connected_components(G))
-        self.stdout.write(f"Islands: {len(islands)}")
-
-        global_max_dist = 0
-        best_path = []
-
-       # 3. Checking each island
-        for island in islands:
-            S = G.subgraph(island)
-            source_node = list(island)[0]
-
-            # Pass 1
-            u = max(nx.single_source_shortest_path_length(S, source_node).items(), key=lambda x: x[1])[0]
-            
-            # Pass 2
-            distances = nx.single_source_shortest_path_length(S, u)
-            v, max_dist = max(distances.items(), key=lambda x: x[1])
-            
-            if max_dist > global_max_dist:
-                global_max_dist = max_dist
-                best_path = nx.shortest_path(S, source=u, target=v)
-
-        names = Category.objects.in_bulk(best_path)
-        path_names = [names[nid].name for nid in best_path]
+        # Snapshot the marks first: links changed during the run stay dirty
+        dirty = set(SimilarityDirtyNode.objects.values_list('category_id', flat=True))
+        incremental = not options['full'] and CategoryComponent.objects.exists()
+
+        # 1. Load Graph (Streamed) - only around changed links when incremental
+        if incremental:
+            engine = engine_class(*self.load_neighbourhood(dirty))
+            islands = engine.islands(seeds=dirty)
+            self.stdout.write(f"Islands recomputed: {len(islands)}")
+        else:
+            engine = engine_class(*load_edge_arrays())
+            # 2. Identify Islands
+            islands = engine.islands()
+            self.stdout.write(f"Islands: {len(islands)}")
+
+        # 3. Checking each island
+        if options['workers'] > 1:
+            # Forked workers must not share this process' DB socket
+            connections.close_all()
+        results = sweep_islands(
+            engine, islands, workers=options['workers'],
+            exact=options['exact'], max_bfs=options['max_bfs'],
+        )
+        if options['exact']:
+            self.report_bounds(islands, results)
+
+        with transaction.atomic():
+            if incremental:
+                stale = set(SimilarityComponent.objects.filter(
+                    members__category_id__in=dirty
+                ).values_list('pk', flat=True))
+                SimilarityComponent.objects.filter(pk__in=stale).delete()
+                SimilarityDirtyNode.objects.filter(category_id__in=dirty).delete()
+            else:
+                SimilarityComponent.objects.all().delete()
+                SimilarityDirtyNode.objects.all().delete()
+            self.store(islands, results)
+
+        best = SimilarityComponent.objects.order_by('-diameter_estimate', 'id').first()
+        if best is None:
+            self.stdout.write("No similarity links found.")
+            return
+
+        names = Category.objects.in_bulk(best.longest_path)
+        path_names = [names[nid].name for nid in best.longest_path]
         self.stdout.write(self.style.SUCCESS(f"\nLongest Rabbit Hole found in {time.time() - start_time:.2f}s"))
-        self.stdout.write(f"Hole: {' -> '.join(path_names)} ({max_dist} steps)")
\ No newline at end of file
+        self.stdout.write(f"Hole: {' -> '.join(path_names)} ({best.diameter_estimate} steps)")
+
+    def load_neighbourhood(self, seeds):
+        """
+        BFS over the edge table from the changed nodes, one query per layer,
+        so only the islands that contain them are read.
+        """
+        src, dst = [], []
+        seen = set(seeds)
+        frontier = list(seeds)
+        with connection.cursor() as cursor:
+            while frontier:
+                reached = set()
+                for i in range(0, len(frontier), BATCH_SIZE):
+                    batch = frontier[i:i + BATCH_SIZE]
+                    placeholders = ', '.join(['%s'] * len(batch))
+                    cursor.execute(
+                        f"SELECT from_category_id, to_category_id FROM {EDGE_TABLE} "
+                        f"WHERE from_category_id IN ({placeholders})",
+                        batch,
+                    )
+                    for u, v in cursor.fetchall():
+                        src.append(u)
+                        dst.append(v)
+                        reached.add(v)
+                frontier = list(reached - seen)
+                seen.update(frontier)
+        return np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64)
+
+    def report_bounds(self, islands, results):
+        for island, result in zip(islands, results):
+            if self.verbosity > 1 or result.diameter != result.upper:
+                self.stdout.write(
+                    f"Island of {len(island)}: {result.diameter} <= diameter <= {result.upper} "
+                    f"({result.bfs_runs} BFS runs)"
+                )
+        certified = sum(result.diameter == result.upper for result in results)
+        runs = sum(result.bfs_runs for result in results)
+        self.stdout.write(f"Exact diameters: {certified}/{len(results)} islands, {runs} BFS runs")
+
+    def store(self, islands, results):
+        components = SimilarityComponent.objects.bulk_create([
+            SimilarityComponent(
+                size=len(island),
+                start_eccentricity=result.start_eccentricity,
+                diameter_estimate=result.diameter,
+                diameter_upper=result.upper,
+                bfs_runs=result.bfs_runs,
+                longest_path=result.path,
+            )
+            for island, result in zip(islands, results)
+        ])
+        CategoryComponent.objects.bulk_create(
+            (
+                CategoryComponent(category_id=int(node), component=component)
+                for island, component in zip(islands, components)
+                for node in island
+            ),
+            batch_size=5000,
+        )
@@ -0,0 +1,45 @@
+import json
+from django.core.management.base import BaseCommand
+from categories.benchmarks import SCENARIOS, TOPOLOGIES, run_benchmarks
+
+class Command(BaseCommand):
+    help = 'Loads a seeded synthetic graph and times the hot paths; writes a JSON report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topology', choices=sorted(TOPOLOGIES), default='random',
+                            help='random (stress_test_rabbits), complete (case_every_to_every) '
+                                 'or star (case_edge)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--size', type=int, default=2000, help='Number of categories')
+        parser.add_argument('--links', type=int, default=20000,
+                            help='Similarity links (random topology only)')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per scenario')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='Only these scenarios (repeatable; default all)')
+        parser.add_argument('--output', '-o', default=None,
+                            help='Write the JSON report here (default stdout)')
+        parser.add_argument('--force', action='store_true',
+                            help='Skip the confirmation prompt (all categories are wiped)')
+
+    def handle(self, *args, **options):
+        if not options['force']:
+            confirm = input("This will DELETE all categories and similarities. Type 'yes' to proceed: ")
+            if confirm.lower() != 'yes':
+                self.stdout.write("Operation cancelled.")
+                return
+
+        report = run_benchmarks(
+            options['topology'], seed=options['seed'], size=options['size'],
+            links=options['links'], repeat=options['repeat'],
+            scenarios=options['scenario'] or SCENARIOS,
+        )
+        payload = json.dumps(report, indent=2)
+        if options['output'] is None:
+            self.stdout.write(payload)
+            return
+
+        with open(options['output'], 'w') as fh:
+            fh.write(payload + '\n')
+        for name, result in report['results'].items():
+            self.stdout.write(f"{name:<18} median {result['median'] * 1000:9.2f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
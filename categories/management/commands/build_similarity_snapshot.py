@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from categories.snapshot import build_snapshot
+
+class Command(BaseCommand):
+    help = 'Exports the similarity graph as memory-mapped CSR arrays for all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            default=None,
+            help='Snapshot directory (defaults to SIMILARITY_SNAPSHOT_DIR)',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or settings.SIMILARITY_SNAPSHOT_DIR
+        if not directory:
+            raise CommandError("Set SIMILARITY_SNAPSHOT_DIR or pass --dir.")
+
+        start_time = time.time()
+        version = build_snapshot(directory)
+        if version is None:
+            self.stdout.write("Another process is already building the snapshot.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot v{version} written to {directory} in {time.time() - start_time:.2f}s"
+        ))
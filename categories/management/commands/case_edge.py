@@ -1,7 +1,7 @@
-import io
 import time
 from django.core.management.base import BaseCommand
 from django.db import connection
+from categories.bulk import copy_links
 from categories.models import Category
 
 class Command(BaseCommand):
@@ -13,7 +13,7 @@ class Command(BaseCommand):
 
         self.stdout.write("Generating Edge Topology...")
         start_time = time.time()
-        buf = io.StringIO()
+        pairs = []
 
         ### ISLAND 1: THE MASSIVE STAR (10,000 nodes, Diameter = 2) ###
         # Center Node
@@ -27,7 +27,7 @@ class Command(BaseCommand):
         # This makes a HUGE island (10,001 nodes)
         sat_ids = Category.objects.filter(name__startswith="Sat_").values_list('id', flat=True)
         for sid in sat_ids:
-            buf.write(f"{center.id}\t{sid}\n")
+            pairs.append((center.id, sid))
 
         
         ### ISLAND 2: THE SNAKE (100 nodes, Diameter = 99) ###
@@ -39,16 +39,11 @@ class Command(BaseCommand):
         for i in range(len(created_snake) - 1):
             u = created_snake[i].id
             v = created_snake[i+1].id
-            buf.write(f"{u}\t{v}\n")
+            pairs.append((u, v))
 
         # Flush to DB
-        buf.seek(0)
         with connection.cursor() as cursor:
-            cursor.copy_from(
-                buf, 
-                'categories_category_similar_categories', 
-                columns=('from_category_id', 'to_category_id')
-            )
+            copy_links(cursor, pairs)
         connection.commit()
 
         self.stdout.write(self.style.SUCCESS(f"Edge Set in {time.time() - start_time:.2f}s"))
@@ -1,8 +1,8 @@
-import io
 import time
 import itertools
 from django.core.management.base import BaseCommand
 from django.db import connection
+from categories.bulk import copy_links
 from categories.models import Category
 
 class Command(BaseCommand):
@@ -27,33 +27,10 @@ class Command(BaseCommand):
         # 3. Stream 2 Million Edges (Memory Efficient)
         self.stdout.write(f"Generating Complete Graph ({len(ids)*(len(ids)-1)//2} edges)...")
         
-        # Using a generator + string buffer to avoid holding 2M tuples in RAM
-        def generate_csv():
-            for a, b in itertools.combinations(ids, 2):
-                yield f"{a}\t{b}\n"
-
-        # 4. Direct Copy into Postgres
-        class StringIteratorIO(io.TextIOBase):
-            def __init__(self, iter):
-                self._iter = iter
-                self._buff = ''
-            def read(self, n=None):
-                while not self._buff:
-                    try:
-                        self._buff = next(self._iter)
-                    except StopIteration:
-                        return ''
-                ret = self._buff[:n]
-                self._buff = self._buff[n:]
-                return ret
-
+        # 4. Direct Copy into Postgres, streamed from the generator so the
+        # 2M pairs are never held in RAM
         with connection.cursor() as cursor:
-            data_iter = StringIteratorIO(generate_csv())
-            cursor.copy_from(
-                data_iter, 
-                'categories_category_similar_categories', 
-                columns=('from_category_id', 'to_category_id')
-            )
+            copy_links(cursor, itertools.combinations(ids, 2))
         
         connection.commit()
 
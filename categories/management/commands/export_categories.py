@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from categories.bulk import export_forest
+from categories.streaming import chunked
+
+class Command(BaseCommand):
+    help = 'Streams the whole forest plus similarity links as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', '-o',
+            default='-',
+            help="File to write, or '-' for stdout (default)",
+        )
+        parser.add_argument(
+            '--format',
+            choices=['ndjson', 'csv'],
+            default=None,
+            help='Output format (default: from the file extension, else ndjson)',
+        )
+
+    def handle(self, *args, **options):
+        path = options['output']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'ndjson')
+
+        if path == '-':
+            for piece in chunked(export_forest(fmt)):
+                self.stdout.write(piece, ending='')
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as fh:
+            fh.writelines(export_forest(fmt))
+        self.stdout.write(self.style.SUCCESS(f"Exported to {path}"))
@@ -1,8 +1,8 @@
-import io
 import time
 import random
 from django.core.management.base import BaseCommand
 from django.db import connection
+from categories.bulk import copy_links
 from categories.models import Category
 
 class Command(BaseCommand):
@@ -57,18 +57,9 @@ class Command(BaseCommand):
             a, b = random.sample(ids, 2)
             pairs.add(tuple(sorted((a, b))))
 
-        buf = io.StringIO()
-        for a, b in pairs:
-            buf.write(f"{a}\t{b}\n")
-        buf.seek(0)
-
-        # 4. Psycopg2 Copy (Direct SQL)
+        # 4. COPY (Direct SQL)
         with connection.cursor() as cursor:
-            cursor.cursor.copy_from(
-                buf, 
-                'categories_category_similar_categories', 
-                columns=('from_category_id', 'to_category_id')
-            )
+            copy_links(cursor, pairs)
         connection.commit()
 
         self.stdout.write(self.style.SUCCESS(
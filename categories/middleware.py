@@ -0,0 +1,204 @@
+"""
+Per-request query and latency instrumentation.
+
+Every database connection, in whatever thread it is opened, gets an
+execute_wrapper that adds to the current request's metrics (found through
+a context variable, which sync_to_async carries into its worker threads,
+so ASGI requests are counted too). QueryMetricsMiddleware sets up those
+metrics per request, and ServerTimingMixin times the DRF renderer. Each
+response then carries a Server-Timing header:
+
+    Server-Timing: db;dur=3.1;desc="4 queries", serialize;dur=0.8, total;dur=7.9
+
+Totals per view are kept in-process and served in Prometheus text format
+by metrics_view when METRICS_ENABLED is set (each gunicorn worker
+reports its own counters). Requests running more than QUERY_BUDGET
+queries are logged as warnings.
+
+Streamed bodies are produced after the middleware returns, so their
+queries are not counted.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'sql_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql_seconds += time.perf_counter() - start
+
+
+def _install(connection):
+    # Permanent and idempotent: outside a request the wrapper is a no-op
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@receiver(connection_created)
+def _wrap_new_connection(sender, connection, **kwargs):
+    _install(connection)
+
+
+class MetricsRegistry:
+    """Running totals per (view, method), rendered for Prometheus."""
+
+    FIELDS = (
+        ('requests_total', 'Requests served.'),
+        ('queries_total', 'Database queries run.'),
+        ('sql_seconds_total', 'Time spent in database calls.'),
+        ('serialize_seconds_total', 'Time spent rendering response bodies.'),
+        ('request_seconds_total', 'Time spent handling requests.'),
+        ('response_bytes_total', 'Response body bytes (streamed bodies excluded).'),
+        ('over_query_budget_total', 'Requests that ran more queries than QUERY_BUDGET.'),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def observe(self, view, method, metrics, seconds, size, over_budget):
+        values = (1, metrics.queries, metrics.sql_seconds, metrics.serialize_seconds,
+                  seconds, size or 0, int(over_budget))
+        with self._lock:
+            totals = self._totals.setdefault((view, method), [0] * len(values))
+            for i, value in enumerate(values):
+                totals[i] += value
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+    def render(self):
+        with self._lock:
+            snapshot = {key: list(values) for key, values in self._totals.items()}
+        lines = []
+        for i, (name, help_text) in enumerate(self.FIELDS):
+            metric = f'category_api_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for (view, method), values in sorted(snapshot.items()):
+                lines.append(f'{metric}{{view="{view}",method="{method}"}} {values[i]:g}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class QueryMetricsMiddleware:
+    """
+    Put first in MIDDLEWARE so every query of the request is counted.
+    Sync and async capable, so async views stay async under ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with _measuring() as (metrics, start):
+            response = self.get_response(request)
+        return self._finish(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        # The context variable follows the request into sync_to_async
+        # threads, where the connections carry the wrapper.
+        with _measuring() as (metrics, start):
+            response = await self.get_response(request)
+        return self._finish(request, response, metrics, time.perf_counter() - start)
+
+    def _finish(self, request, response, metrics, seconds):
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.sql_seconds * 1000:.1f};desc="{metrics.queries} queries"',
+            f'serialize;dur={metrics.serialize_seconds * 1000:.1f}',
+            f'total;dur={seconds * 1000:.1f}',
+        ])
+        size = None if response.streaming else len(response.content)
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        over_budget = metrics.queries > settings.QUERY_BUDGET
+        REGISTRY.observe(view, request.method, metrics, seconds, size, over_budget)
+        if over_budget:
+            logger.warning(
+                "%s %s ran %d queries (budget %d) in %.1f ms, %.1f ms in SQL",
+                request.method, request.get_full_path(), metrics.queries,
+                settings.QUERY_BUDGET, seconds * 1000, metrics.sql_seconds * 1000,
+            )
+        return response
+
+
+@contextmanager
+def _measuring():
+    # Connections of this thread opened before this module was imported
+    # never saw connection_created
+    for connection in connections.all(initialized_only=True):
+        _install(connection)
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics, time.perf_counter()
+    finally:
+        _current.reset(token)
+
+
+class ServerTimingMixin:
+    """
+    DRF views: times the renderer (the `serialize` entry). Rendering runs
+    after the view returns, so the response's render() is wrapped here.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        metrics = _current.get()
+        render = getattr(response, 'render', None)
+        if metrics is None or render is None:
+            return response
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                metrics.serialize_seconds += time.perf_counter() - start
+
+        response.render = timed_render
+        return response
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4')
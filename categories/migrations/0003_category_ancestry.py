@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-18 18:06
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat
+
+
+def backfill_ancestry(apps, schema_editor):
+    """Fills path/depth for existing rows, one UPDATE per tree level."""
+    Category = apps.get_model('categories', 'Category')
+    level = Category.objects.filter(parent__isnull=True)
+    depth = 0
+    while level.exists():
+        depth += 1
+        parents = Category.objects.filter(pk=OuterRef('parent_id'))
+        Category.objects.filter(parent__in=level).update(
+            path=Concat(
+                Subquery(parents.values('path')),
+                Cast('parent_id', models.TextField()),
+                Value('/'),
+            ),
+            depth=depth,
+        )
+        level = Category.objects.filter(depth=depth, parent__isnull=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0002_alter_category_image_alter_category_parent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.TextField(default='/', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['text_pattern_ops']),
+        ),
+        migrations.RunPython(backfill_ancestry, migrations.RunPython.noop),
+    ]
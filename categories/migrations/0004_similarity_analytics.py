@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 18:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0003_category_ancestry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarityComponent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.PositiveIntegerField()),
+                ('start_eccentricity', models.PositiveIntegerField()),
+                ('diameter_estimate', models.PositiveIntegerField(db_index=True)),
+                ('longest_path', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimilarityDirtyNode',
+            fields=[
+                ('category_id', models.BigIntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CategoryComponent',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity_component', serialize=False, to='categories.category')),
+                ('component', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='categories.similaritycomponent')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-18 19:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0004_similarity_analytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='similaritycomponent',
+            name='bfs_runs',
+            field=models.PositiveIntegerField(default=2),
+        ),
+        migrations.AddField(
+            model_name='similaritycomponent',
+            name='diameter_upper',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,171 @@
+# Generated by Django 6.0 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+CATEGORY = 'categories_category'
+EDGES = 'categories_category_similar_categories'
+
+# PostgreSQL: inserts and deletes use statement-level triggers with
+# transition tables, so a COPY or INSERT ... SELECT of a million rows
+# updates each parent once (with the total) instead of once per row.
+# Re-parenting is a row-level trigger that only fires when parent_id
+# changes; the counter UPDATEs themselves never re-trigger anything.
+POSTGRESQL_TRIGGERS = f"""
+CREATE FUNCTION category_children_added() RETURNS trigger AS $$
+BEGIN
+    UPDATE {CATEGORY} c SET child_count = c.child_count + d.n
+    FROM (SELECT parent_id, COUNT(*) AS n FROM new_rows
+          WHERE parent_id IS NOT NULL GROUP BY parent_id) d
+    WHERE c.id = d.parent_id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_children_removed() RETURNS trigger AS $$
+BEGIN
+    UPDATE {CATEGORY} c SET child_count = c.child_count - d.n
+    FROM (SELECT parent_id, COUNT(*) AS n FROM old_rows
+          WHERE parent_id IS NOT NULL GROUP BY parent_id) d
+    WHERE c.id = d.parent_id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_reparented() RETURNS trigger AS $$
+BEGIN
+    UPDATE {CATEGORY} SET child_count = child_count - 1 WHERE id = OLD.parent_id;
+    UPDATE {CATEGORY} SET child_count = child_count + 1 WHERE id = NEW.parent_id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_links_added() RETURNS trigger AS $$
+BEGIN
+    -- The through-table holds both directions, so from_category_id
+    -- alone counts each endpoint once.
+    UPDATE {CATEGORY} c SET similar_count = c.similar_count + d.n
+    FROM (SELECT from_category_id AS id, COUNT(*) AS n FROM new_rows
+          GROUP BY from_category_id) d
+    WHERE c.id = d.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_links_removed() RETURNS trigger AS $$
+BEGIN
+    UPDATE {CATEGORY} c SET similar_count = c.similar_count - d.n
+    FROM (SELECT from_category_id AS id, COUNT(*) AS n FROM old_rows
+          GROUP BY from_category_id) d
+    WHERE c.id = d.id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER category_children_added AFTER INSERT ON {CATEGORY}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION category_children_added();
+CREATE TRIGGER category_children_removed AFTER DELETE ON {CATEGORY}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION category_children_removed();
+CREATE TRIGGER category_reparented AFTER UPDATE OF parent_id ON {CATEGORY}
+    FOR EACH ROW WHEN (OLD.parent_id IS DISTINCT FROM NEW.parent_id)
+    EXECUTE FUNCTION category_reparented();
+CREATE TRIGGER category_links_added AFTER INSERT ON {EDGES}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION category_links_added();
+CREATE TRIGGER category_links_removed AFTER DELETE ON {EDGES}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION category_links_removed();
+"""
+
+POSTGRESQL_DROP = f"""
+DROP TRIGGER IF EXISTS category_children_added ON {CATEGORY};
+DROP TRIGGER IF EXISTS category_children_removed ON {CATEGORY};
+DROP TRIGGER IF EXISTS category_reparented ON {CATEGORY};
+DROP TRIGGER IF EXISTS category_links_added ON {EDGES};
+DROP TRIGGER IF EXISTS category_links_removed ON {EDGES};
+DROP FUNCTION IF EXISTS category_children_added();
+DROP FUNCTION IF EXISTS category_children_removed();
+DROP FUNCTION IF EXISTS category_reparented();
+DROP FUNCTION IF EXISTS category_links_added();
+DROP FUNCTION IF EXISTS category_links_removed();
+"""
+
+# SQLite has no statement-level triggers, so these are row-level. Note
+# that SQLite drops triggers when Django rebuilds the table for an
+# AlterField; such a migration must recreate them.
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER category_children_added AFTER INSERT ON {CATEGORY}
+        WHEN NEW.parent_id IS NOT NULL BEGIN
+            UPDATE {CATEGORY} SET child_count = child_count + 1 WHERE id = NEW.parent_id;
+        END""",
+    f"""CREATE TRIGGER category_children_removed AFTER DELETE ON {CATEGORY}
+        WHEN OLD.parent_id IS NOT NULL BEGIN
+            UPDATE {CATEGORY} SET child_count = child_count - 1 WHERE id = OLD.parent_id;
+        END""",
+    f"""CREATE TRIGGER category_reparented AFTER UPDATE OF parent_id ON {CATEGORY}
+        WHEN OLD.parent_id IS NOT NEW.parent_id BEGIN
+            UPDATE {CATEGORY} SET child_count = child_count - 1 WHERE id = OLD.parent_id;
+            UPDATE {CATEGORY} SET child_count = child_count + 1 WHERE id = NEW.parent_id;
+        END""",
+    f"""CREATE TRIGGER category_links_added AFTER INSERT ON {EDGES} BEGIN
+            UPDATE {CATEGORY} SET similar_count = similar_count + 1 WHERE id = NEW.from_category_id;
+        END""",
+    f"""CREATE TRIGGER category_links_removed AFTER DELETE ON {EDGES} BEGIN
+            UPDATE {CATEGORY} SET similar_count = similar_count - 1 WHERE id = OLD.from_category_id;
+        END""",
+]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {name}" for name in (
+        'category_children_added', 'category_children_removed', 'category_reparented',
+        'category_links_added', 'category_links_removed',
+    )
+]
+
+BACKFILL = [
+    f"""UPDATE {CATEGORY} SET child_count = (
+        SELECT COUNT(*) FROM {CATEGORY} c WHERE c.parent_id = {CATEGORY}.id
+    )""",
+    f"""UPDATE {CATEGORY} SET similar_count = (
+        SELECT COUNT(*) FROM {EDGES} e WHERE e.from_category_id = {CATEGORY}.id
+    )""",
+]
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_TRIGGERS)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+    # Other backends get no triggers: the counters are then only
+    # refreshed by this backfill.
+    for statement in BACKFILL:
+        schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_DROP)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0005_component_diameter_bounds'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='child_count',
+            field=models.PositiveIntegerField(db_default=0, db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='similar_count',
+            field=models.PositiveIntegerField(db_default=0, db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
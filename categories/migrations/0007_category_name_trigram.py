@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-18 20:10
+
+from django.db import migrations
+
+# Matches the left-hand side Django emits for name__icontains on
+# PostgreSQL (UPPER("name"::text) LIKE UPPER('%...%')), so the admin
+# search and any icontains filter are served by the index.
+CREATE_INDEX = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS category_name_trgm_idx
+    ON categories_category USING gin ((UPPER(name::text)) gin_trgm_ops);
+"""
+
+DROP_INDEX = "DROP INDEX IF EXISTS category_name_trgm_idx;"
+
+
+def create_trigram_index(apps, schema_editor):
+    # Trigram indexes are PostgreSQL only; elsewhere search stays a scan
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_INDEX)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0006_category_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
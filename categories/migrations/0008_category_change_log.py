@@ -0,0 +1,161 @@
+# Generated by Django 6.0 on 2026-10-18 20:40
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+CATEGORY = 'categories_category'
+EDGES = 'categories_category_similar_categories'
+LOG = 'categories_categorychange'
+
+# PostgreSQL: inserts and deletes are logged by statement-level triggers
+# (one INSERT ... SELECT per COPY or bulk statement). Edits are row-level
+# with a WHEN clause, so the path/depth and counter UPDATEs that touch
+# many rows never fire them. The through-table holds both directions of
+# a link; only the from < to row is logged.
+POSTGRESQL_TRIGGERS = f"""
+CREATE FUNCTION category_log_created() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {LOG} (action, category_id, ref_id)
+    SELECT 'create', id, parent_id FROM new_rows ORDER BY id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_log_deleted() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {LOG} (action, category_id)
+    SELECT 'delete', id FROM old_rows ORDER BY id;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_log_moved() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {LOG} (action, category_id, ref_id) VALUES ('move', NEW.id, NEW.parent_id);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_log_edited() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {LOG} (action, category_id) VALUES ('update', NEW.id);
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_log_linked() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {LOG} (action, category_id, ref_id)
+    SELECT 'link', from_category_id, to_category_id FROM new_rows
+    WHERE from_category_id < to_category_id ORDER BY 2, 3;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE FUNCTION category_log_unlinked() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO {LOG} (action, category_id, ref_id)
+    SELECT 'unlink', from_category_id, to_category_id FROM old_rows
+    WHERE from_category_id < to_category_id ORDER BY 2, 3;
+    RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+CREATE TRIGGER category_log_created AFTER INSERT ON {CATEGORY}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION category_log_created();
+CREATE TRIGGER category_log_deleted AFTER DELETE ON {CATEGORY}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION category_log_deleted();
+CREATE TRIGGER category_log_moved AFTER UPDATE OF parent_id ON {CATEGORY}
+    FOR EACH ROW WHEN (OLD.parent_id IS DISTINCT FROM NEW.parent_id)
+    EXECUTE FUNCTION category_log_moved();
+CREATE TRIGGER category_log_edited AFTER UPDATE OF name, description, image ON {CATEGORY}
+    FOR EACH ROW WHEN ((OLD.name, OLD.description, OLD.image) IS DISTINCT FROM (NEW.name, NEW.description, NEW.image))
+    EXECUTE FUNCTION category_log_edited();
+CREATE TRIGGER category_log_linked AFTER INSERT ON {EDGES}
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION category_log_linked();
+CREATE TRIGGER category_log_unlinked AFTER DELETE ON {EDGES}
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION category_log_unlinked();
+"""
+
+TRIGGER_NAMES = {
+    'category_log_created': CATEGORY,
+    'category_log_deleted': CATEGORY,
+    'category_log_moved': CATEGORY,
+    'category_log_edited': CATEGORY,
+    'category_log_linked': EDGES,
+    'category_log_unlinked': EDGES,
+}
+
+POSTGRESQL_DROP = ''.join(
+    f"DROP TRIGGER IF EXISTS {name} ON {table};\nDROP FUNCTION IF EXISTS {name}();\n"
+    for name, table in TRIGGER_NAMES.items()
+)
+
+# Row-level equivalents (see the note on table rebuilds in 0006)
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER category_log_created AFTER INSERT ON {CATEGORY} BEGIN
+            INSERT INTO {LOG} (action, category_id, ref_id) VALUES ('create', NEW.id, NEW.parent_id);
+        END""",
+    f"""CREATE TRIGGER category_log_deleted AFTER DELETE ON {CATEGORY} BEGIN
+            INSERT INTO {LOG} (action, category_id) VALUES ('delete', OLD.id);
+        END""",
+    f"""CREATE TRIGGER category_log_moved AFTER UPDATE OF parent_id ON {CATEGORY}
+        WHEN OLD.parent_id IS NOT NEW.parent_id BEGIN
+            INSERT INTO {LOG} (action, category_id, ref_id) VALUES ('move', NEW.id, NEW.parent_id);
+        END""",
+    f"""CREATE TRIGGER category_log_edited AFTER UPDATE OF name, description, image ON {CATEGORY}
+        WHEN OLD.name IS NOT NEW.name OR OLD.description IS NOT NEW.description
+            OR OLD.image IS NOT NEW.image BEGIN
+            INSERT INTO {LOG} (action, category_id) VALUES ('update', NEW.id);
+        END""",
+    f"""CREATE TRIGGER category_log_linked AFTER INSERT ON {EDGES}
+        WHEN NEW.from_category_id < NEW.to_category_id BEGIN
+            INSERT INTO {LOG} (action, category_id, ref_id)
+            VALUES ('link', NEW.from_category_id, NEW.to_category_id);
+        END""",
+    f"""CREATE TRIGGER category_log_unlinked AFTER DELETE ON {EDGES}
+        WHEN OLD.from_category_id < OLD.to_category_id BEGIN
+            INSERT INTO {LOG} (action, category_id, ref_id)
+            VALUES ('unlink', OLD.from_category_id, OLD.to_category_id);
+        END""",
+]
+
+SQLITE_DROP = [f"DROP TRIGGER IF EXISTS {name}" for name in TRIGGER_NAMES]
+
+
+def create_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_TRIGGERS)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+    # Other backends log nothing; the feed then stays empty.
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(POSTGRESQL_DROP)
+    elif vendor == 'sqlite':
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0007_category_name_trigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('move', 'Move'), ('delete', 'Delete'), ('link', 'Link'), ('unlink', 'Unlink')], max_length=6)),
+                ('category_id', models.BigIntegerField()),
+                ('ref_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+            ],
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 6.0 on 2026-10-18 21:10
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+change_log = import_module('categories.migrations.0008_category_change_log')
+
+LOG = change_log.LOG
+
+
+# PostgreSQL: every log row records the transaction that wrote it, so the
+# feed can hold back rows that an older, still running transaction could
+# yet land below (CategoryChange.objects.settled()). Set as a column
+# default, the triggers from 0008 pick it up unchanged. The migration state
+# keeps db_default=0, which is what other backends store.
+def record_transaction(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"ALTER TABLE {LOG} ALTER COLUMN txid SET DEFAULT pg_current_xact_id()::text::bigint"
+        )
+
+
+def forget_transaction(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"ALTER TABLE {LOG} ALTER COLUMN txid SET DEFAULT 0")
+
+
+# SQLite rebuilds the log table to add the column, which the log triggers
+# (they name it) do not survive; take them off around the rebuild.
+def drop_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in change_log.SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+def create_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in change_log.SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0008_category_change_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_triggers, create_sqlite_triggers),
+        migrations.AddField(
+            model_name='categorychange',
+            name='txid',
+            field=models.BigIntegerField(db_default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='categorychange',
+            index=models.Index(fields=['txid', 'id'], name='category_change_txid_idx'),
+        ),
+        migrations.RunPython(create_sqlite_triggers, drop_sqlite_triggers),
+        migrations.RunPython(record_transaction, forget_transaction),
+    ]
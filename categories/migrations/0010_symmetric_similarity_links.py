@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 21:40
+
+from django.db import migrations
+
+EDGES = 'categories_category_similar_categories'
+DIRTY = 'categories_similaritydirtynode'
+
+# The generator commands used to COPY one row per pair, while the counter
+# triggers (0006), the path search and the analysis all rely on the
+# through-table holding both directions, as Django's symmetrical M2M
+# writes it. Add the missing reverse rows: the triggers then fix
+# similar_count, and the endpoints are queued for analyze_rabbits.
+MISSING = f"""
+    SELECT e.from_category_id AS a, e.to_category_id AS b FROM {EDGES} e
+    WHERE NOT EXISTS (
+        SELECT 1 FROM {EDGES} r
+        WHERE r.from_category_id = e.to_category_id AND r.to_category_id = e.from_category_id
+    )
+"""
+
+REPAIR = [
+    f"""INSERT INTO {DIRTY} (category_id)
+        SELECT id FROM (SELECT a AS id FROM ({MISSING}) m UNION SELECT b FROM ({MISSING}) m) AS d
+        WHERE true ON CONFLICT DO NOTHING""",
+    f"""INSERT INTO {EDGES} (from_category_id, to_category_id)
+        SELECT b, a FROM ({MISSING}) AS m""",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0009_change_log_commit_order'),
+    ]
+
+    # Nothing to undo: symmetric rows are the layout every version expects
+    operations = [
+        migrations.RunSQL(REPAIR, migrations.RunSQL.noop),
+    ]
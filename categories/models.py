@@ -1,6 +1,140 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Concat, Now, Substr, Upper
 from rest_framework.exceptions import ValidationError
 
+# Materialized path separator. A node's path lists the ids of all its
+# ancestors, root first, e.g. "/1/5/" for a node whose parent is 5 and
+# grandparent is 1. Roots have the path "/".
+PATH_SEP = '/'
+
+# Owned by the database triggers; a stale in-memory copy must never be
+# written back.
+COUNTER_FIELDS = ('child_count', 'similar_count')
+
+
+class CategoryQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), so fill the ancestry index from the
+        # (already saved) parent instances the caller passes in.
+        objs = list(objs)
+        for obj in objs:
+            obj.set_ancestry()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def descendants_of(self, category, include_self=False):
+        """All nodes below `category`: one range scan on the path index."""
+        lookup = Q(path__startswith=category.subtree_path)
+        if include_self:
+            lookup |= Q(pk=category.pk)
+        return self.filter(lookup)
+
+    def ancestors_of(self, category):
+        return self.filter(pk__in=category.ancestor_ids).order_by('depth')
+
+    def ancestor_ids_of(self, pk):
+        """
+        Ids of `pk` and all its ancestors, read from the adjacency list in a
+        single WITH RECURSIVE query (PostgreSQL and SQLite >= 3.8.3 both
+        support it). UNION instead of UNION ALL stops on corrupted cycles.
+        Unlike the path index, this always reflects committed parent_ids.
+        """
+        table = self.model._meta.db_table
+        sql = f"""
+            WITH RECURSIVE ancestry(id, parent_id) AS (
+                SELECT id, parent_id FROM {table} WHERE id = %s
+                UNION
+                SELECT c.id, c.parent_id FROM {table} c
+                JOIN ancestry a ON c.id = a.parent_id
+            )
+            SELECT id FROM ancestry
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [pk])
+            return [row[0] for row in cursor.fetchall()]
+
+    def lock_rows(self, pks):
+        """
+        SELECT ... FOR UPDATE in id order so concurrent movers queue up
+        instead of deadlocking. A no-op on backends without row locks.
+        Must run inside a transaction.
+        """
+        return list(
+            self.model.objects.select_for_update()
+            .filter(pk__in=pks).order_by('pk').values_list('pk', flat=True)
+        )
+
+    def similarity_edges_from(self, ids, batch_size=500):
+        """
+        (id, similar id) pairs for every id in `ids`, straight from the M2M
+        through-table (which stores both directions), `batch_size` ids per
+        query so IN lists stay bounded.
+        """
+        through = self.model.similar_categories.through.objects
+        ids = list(ids)
+        for i in range(0, len(ids), batch_size):
+            yield from through.filter(
+                from_category_id__in=ids[i:i + batch_size]
+            ).values_list('from_category_id', 'to_category_id').iterator()
+
+    def search(self, query, prefix=False):
+        """
+        Name search annotated with a `rank` (higher is better), ordered by
+        rank then id. `prefix=True` is autocomplete: names starting with
+        `query`, alphabetical. On PostgreSQL both are served by the
+        pg_trgm index on UPPER(name) (migration 0007) and ranked by
+        trigram similarity; other backends rank exact > prefix > substring.
+        """
+        if prefix:
+            return self.filter(name__istartswith=query).order_by('name', 'id')
+
+        if connection.vendor == 'postgresql':
+            from django.contrib.postgres.search import TrigramSimilarity
+
+            # `%` is the indexable "similar enough" operator (pg_trgm)
+            table = self.model._meta.db_table
+            similar = RawSQL(
+                f'UPPER("{table}"."name"::text) %% UPPER(%s)', [query], output_field=models.BooleanField(),
+            )
+            return self.filter(Q(name__icontains=query) | Q(similar)).annotate(
+                rank=Cast(TrigramSimilarity(Upper('name'), Upper(Value(query))), models.FloatField()),
+            ).order_by('-rank', 'id')
+
+        return self.filter(name__icontains=query).annotate(
+            rank=Case(
+                When(name__iexact=query, then=Value(3.0)),
+                When(name__istartswith=query, then=Value(2.0)),
+                default=Value(1.0),
+                output_field=models.FloatField(),
+            ),
+        ).order_by('-rank', 'id')
+
+    def rebuild_ancestry(self):
+        """
+        Recomputes path/depth for the whole table, level by level.
+        One UPDATE per tree level - use after raw SQL loaders.
+        """
+        objects = self.model.objects
+        objects.filter(parent__isnull=True).update(path=PATH_SEP, depth=0)
+        objects.filter(parent__isnull=False).update(depth=0)
+        level = objects.filter(parent__isnull=True)
+        depth = 0
+        while level.exists():
+            depth += 1
+            parents = objects.filter(pk=OuterRef('parent_id'))
+            objects.filter(parent__in=level).update(
+                path=Concat(
+                    Subquery(parents.values('path')),
+                    Cast('parent_id', models.TextField()),
+                    Value(PATH_SEP),
+                ),
+                depth=depth,
+            )
+            level = objects.filter(depth=depth, parent__isnull=False)
+
+
 class Category(models.Model):
     name = models.CharField(max_length=255, db_index=True)
     description = models.TextField(blank=True, null=True)
@@ -15,6 +149,16 @@ class Category(models.Model):
         related_name='children',
     )
 
+    # Tree: Ancestry index (materialized path), kept in sync by save()
+    path = models.TextField(default=PATH_SEP, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False, db_index=True)
+
+    # Denormalized counters, maintained by database triggers (migration
+    # 0006) so raw SQL and COPY loaders keep them right too. Never
+    # written by save(); see COUNTER_FIELDS.
+    child_count = models.PositiveIntegerField(default=0, db_default=0, editable=False, db_index=True)
+    similar_count = models.PositiveIntegerField(default=0, db_default=0, editable=False, db_index=True)
+
     # Similarity: Symmetrical M2M
     similar_categories = models.ManyToManyField(
         'self', 
@@ -22,25 +166,186 @@ class Category(models.Model):
         symmetrical=True
     )
 
+    objects = CategoryQuerySet.as_manager()
+
+    @property
+    def subtree_path(self):
+        """Path prefix shared by every descendant of this node."""
+        return f"{self.path}{self.id}{PATH_SEP}"
+
+    @property
+    def ancestor_ids(self):
+        return [int(part) for part in self.path.split(PATH_SEP) if part]
+
+    def set_ancestry(self):
+        """Derives path/depth from the parent (one PK lookup at most)."""
+        if self.parent_id is None:
+            self.path, self.depth = PATH_SEP, 0
+            return
+        parent = self.parent
+        self.path = f"{parent.path}{parent.id}{PATH_SEP}"
+        self.depth = parent.depth + 1
+
     def clean(self):
         # 1. Self-parenting guard
         if self.parent_id and self.id == self.parent_id:
             raise ValidationError("A category cannot be its own parent.")
         
         # 2. Circular dependency guard (for existing objects)
-        if self.id and self.parent:
-            curr = self.parent
-            while curr is not None:
-                if curr.id == self.id:
-                    raise ValidationError("Circular dependency detected in category tree.")
-                curr = curr.parent
+        # The parent's path already holds all its ancestors, so a single
+        # lookup replaces the walk up the tree.
+        if self.id and self.parent_id:
+            if self.id in self.parent.ancestor_ids:
+                raise ValidationError("Circular dependency detected in category tree.")
+
+        self.set_ancestry()
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in COUNTER_FIELDS
+            ]
+        with transaction.atomic():
+            old_subtree = None
+            if self.pk:
+                old_path = Category.objects.filter(pk=self.pk).values_list('path', flat=True).first()
+                if old_path is not None and old_path != self.path:
+                    old_subtree = f"{old_path}{self.pk}{PATH_SEP}"
+            super().save(*args, **kwargs)
+            if old_subtree:
+                self._move_descendants(old_subtree)
+
+    def _move_descendants(self, old_subtree):
+        """Re-roots every descendant's path in one set-based UPDATE."""
+        depth_delta = self.depth - (old_subtree.count(PATH_SEP) - 2)
+        Category.objects.filter(path__startswith=old_subtree).update(
+            path=Concat(Value(self.subtree_path), Substr('path', len(old_subtree) + 1)),
+            depth=F('depth') + depth_delta,
+        )
 
     def __str__(self):
         return self.name
 
     class Meta:
-        verbose_name_plural = "Categories"
\ No newline at end of file
+        verbose_name_plural = "Categories"
+        indexes = [
+            # text_pattern_ops lets PostgreSQL serve `LIKE 'prefix%'`
+            # (path__startswith) from the index; ignored on other backends.
+            models.Index(fields=['path'], name='category_path_idx', opclasses=['text_pattern_ops']),
+        ]
+
+
+# --- Similarity graph analytics (written by `manage.py analyze_rabbits`) ---
+
+class SimilarityComponent(models.Model):
+    """One connected island of the similarity graph, as of the last analysis."""
+    size = models.PositiveIntegerField()
+    # Eccentricity of the node the first BFS sweep started from
+    start_eccentricity = models.PositiveIntegerField()
+    # Double-sweep estimate (a lower bound) of the island's diameter
+    diameter_estimate = models.PositiveIntegerField(db_index=True)
+    # Certified upper bound from `analyze_rabbits --exact`; equal to
+    # diameter_estimate once the diameter is proven exact
+    diameter_upper = models.PositiveIntegerField(null=True, blank=True)
+    bfs_runs = models.PositiveIntegerField(default=2)
+    # Category ids along the longest shortest path the sweep found
+    longest_path = models.JSONField(default=list)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def is_exact(self):
+        return self.diameter_upper == self.diameter_estimate
+
+    def __str__(self):
+        return f"Island {self.id} ({self.size} nodes)"
+
+
+class CategoryComponent(models.Model):
+    """Which island a category belongs to (only categories with links)."""
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='similarity_component',
+    )
+    component = models.ForeignKey(
+        SimilarityComponent,
+        on_delete=models.CASCADE,
+        related_name='members',
+    )
+
+
+class SimilarityDirtyNode(models.Model):
+    """
+    Categories whose links changed since the last analysis; the next
+    incremental run only recomputes the islands around them. Plain id
+    (no FK) so marks survive the category itself being deleted.
+    """
+    category_id = models.BigIntegerField(primary_key=True)
+
+    @classmethod
+    def mark(cls, ids):
+        cls.objects.bulk_create(
+            [cls(category_id=pk) for pk in ids], ignore_conflicts=True
+        )
+
+
+class CategoryChangeQuerySet(models.QuerySet):
+
+    def settled(self):
+        """
+        Entries no running transaction can still add to or precede: on
+        PostgreSQL, those written below the oldest in-flight transaction
+        id. Ids come from a sequence at INSERT time, so a transaction that
+        commits late can land below ids already served; (txid, id) order
+        restricted to settled entries never moves past it.
+        """
+        if connection.vendor != 'postgresql':
+            return self  # one writer at a time, ids are in commit order
+        return self.filter(txid__lt=RawSQL("pg_snapshot_xmin(pg_current_snapshot())::text::bigint", ()))
+
+
+class CategoryChange(models.Model):
+    """
+    Append-only log of hierarchy and similarity writes, served by
+    /api/categories/changes/?since=<cursor>. Written by database triggers
+    (migration 0008), so COPY and raw SQL loaders are logged too. Plain
+    ids (no FK) so entries outlive the categories they mention.
+    """
+
+    class Action(models.TextChoices):
+        CREATE = 'create'
+        UPDATE = 'update'
+        MOVE = 'move'
+        DELETE = 'delete'
+        LINK = 'link'
+        UNLINK = 'unlink'
+
+    action = models.CharField(max_length=6, choices=Action.choices)
+    category_id = models.BigIntegerField()
+    # Parent for create/move (null = root), the other end for link/unlink
+    # (logged once per pair, lower id first)
+    ref_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(db_default=Now())
+    # Writing transaction: pg_current_xact_id() on PostgreSQL (a column
+    # default set by migration 0009), 0 elsewhere. See settled().
+    txid = models.BigIntegerField(db_default=0, editable=False)
+
+    objects = CategoryChangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['txid', 'id'], name='category_change_txid_idx'),
+        ]
+
+
+class CacheVersion(models.Model):
+    """
+    Version counters behind the versioned caches (see cache.py). Kept in
+    the database so every worker, whatever CACHE_URL is, reads the same
+    value, and bumps are an atomic UPDATE.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    value = models.BigIntegerField()
@@ -0,0 +1,32 @@
+"""
+orjson-backed JSON renderer for the category endpoints.
+
+Same output as DRF's compact JSONRenderer at a fraction of the CPU.
+Falls back to JSONRenderer when orjson is not installed, or when an
+indented body is asked for (orjson only indents by 2).
+"""
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_fallback = JSONEncoder()
+
+
+def _default(obj):
+    # Lazy translations, Decimals, querysets... the way DRF encodes them
+    return _fallback.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Datetimes go through DRF's encoder too, so they format the same
+        return orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
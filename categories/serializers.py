@@ -1,5 +1,6 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
-from .models import Category
+from .models import Category, SimilarityComponent
 
 class CategorySerializer(serializers.ModelSerializer):
     """Used for Lists: Fast and Slim"""
@@ -9,8 +10,43 @@ class CategorySerializer(serializers.ModelSerializer):
 
 class CategoryDetailSerializer(serializers.ModelSerializer):
     """Used for Retrieve: Detailed with Similarities"""
-    similar_count = serializers.IntegerField(source='similar_categories.count', read_only=True)
-    
+    # Stored counters (kept by DB triggers), no per-object COUNT query
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'image', 'parent', 'similar_count']
\ No newline at end of file
+        fields = ['id', 'name', 'description', 'image', 'parent', 'depth', 'child_count', 'similar_count']
+
+# values() fast paths for list/retrieve: the same output as the two
+# serializers above, without model instances or per-field to_representation
+LIST_FIELDS = ('id', 'name', 'parent_id')
+DETAIL_FIELDS = ('id', 'name', 'description', 'image', 'parent_id', 'depth', 'child_count', 'similar_count')
+
+
+def list_rows(rows):
+    """CategorySerializer output for values(*LIST_FIELDS) rows (renamed in place)."""
+    for row in rows:
+        row['parent'] = row.pop('parent_id')
+    return rows
+
+
+def detail_row(row, request=None):
+    """CategoryDetailSerializer output for one values(*DETAIL_FIELDS) row."""
+    data = {key: row[key] for key in ('id', 'name', 'description', 'image')}
+    data['parent'] = row['parent_id']
+    data.update(depth=row['depth'], child_count=row['child_count'], similar_count=row['similar_count'])
+    # ImageField: absolute URL, or null when empty
+    if data['image']:
+        url = default_storage.url(data['image'])
+        data['image'] = request.build_absolute_uri(url) if request is not None else url
+    else:
+        data['image'] = None
+    return data
+
+
+class SimilarityComponentSerializer(serializers.ModelSerializer):
+    """Stored analyze_rabbits results for one similarity island"""
+    class Meta:
+        model = SimilarityComponent
+        fields = [
+            'id', 'size', 'start_eccentricity', 'diameter_estimate', 'diameter_upper',
+            'is_exact', 'bfs_runs', 'longest_path', 'computed_at',
+        ]
@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_similarity_version, bump_tree_version
+from .models import Category, SimilarityDirtyNode
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_tree(sender, **kwargs):
+    # Covers create, update, move (a save) and delete, including cascades.
+    # After commit, so a reader cannot re-cache the old tree under the new version.
+    transaction.on_commit(bump_tree_version)
+
+
+@receiver(m2m_changed, sender=Category.similar_categories.through)
+def mark_similarity_dirty(sender, instance, action, pk_set, **kwargs):
+    # Both endpoints of every changed link, so the next analyze_rabbits
+    # run can recompute just the islands around them.
+    if action in ('post_add', 'post_remove'):
+        SimilarityDirtyNode.mark({instance.pk, *pk_set})
+    elif action == 'pre_clear':
+        neighbours = instance.similar_categories.values_list('pk', flat=True)
+        SimilarityDirtyNode.mark({instance.pk, *neighbours})
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_similarity_version)
+
+
+@receiver(pre_delete, sender=Category)
+def mark_deleted_links_dirty(sender, instance, **kwargs):
+    # Deleting a category drops its links without an m2m_changed signal
+    neighbours = instance.similar_categories.values_list('pk', flat=True)
+    SimilarityDirtyNode.mark({instance.pk, *neighbours})
+    transaction.on_commit(bump_similarity_version)
@@ -0,0 +1,143 @@
+"""
+Shared, memory-mapped snapshot of the similarity graph.
+
+The edge table is exported once as CSR arrays (node_ids/indptr/indices
+.npy files). Every gunicorn worker maps the same files read-only, so the
+page cache holds one copy no matter how many processes use it.
+
+Layout under SIMILARITY_SNAPSHOT_DIR:
+
+    v<version>/node_ids.npy, indptr.npy, indices.npy
+    current.json      {"version": ...}, swapped in with os.replace()
+
+A snapshot is only served while its version equals the similarity version
+counter (bumped on every link change, see signals.py). When they differ,
+the first worker to notice rebuilds in a background thread, guarded by
+a flock so only one process builds at a time; callers fall back to the
+database until the new snapshot is published.
+"""
+import fcntl
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .cache import get_similarity_version
+from .graph import CSRGraph
+
+EDGE_TABLE = 'categories_category_similar_categories'
+# Rows pulled per fetchmany() when loading the whole edge table
+FETCH_SIZE = 100_000
+ARRAYS = ('node_ids', 'indptr', 'indices')
+
+_loaded = None            # (version, CSRGraph) mapped by this process
+_rebuilding = threading.Lock()
+
+
+def load_edge_arrays():
+    """The whole edge table as two id arrays, fetched in chunks."""
+    src, dst = [], []
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT from_category_id, to_category_id FROM {EDGE_TABLE}")
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            chunk = np.array(rows, dtype=np.int64)
+            src.append(chunk[:, 0])
+            dst.append(chunk[:, 1])
+    if not src:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(src), np.concatenate(dst)
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, 'current.json')) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def build_snapshot(directory=None):
+    """
+    Exports the edge table and publishes it atomically. Returns the new
+    version, or None if another process holds the build lock.
+    """
+    directory = directory or settings.SIMILARITY_SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+
+        # Read the version before the edges: a link added meanwhile bumps
+        # it, so this snapshot is already stale and will be rebuilt.
+        version = get_similarity_version()
+        graph = CSRGraph.from_edges(*load_edge_arrays())
+
+        staging = os.path.join(directory, f'.build-{os.getpid()}')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in ARRAYS:
+            np.save(os.path.join(staging, f'{name}.npy'), getattr(graph, name))
+        target = os.path.join(directory, f'v{version}')
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(staging, target)
+
+        manifest = os.path.join(directory, '.current.json.tmp')
+        with open(manifest, 'w') as fh:
+            json.dump({'version': version}, fh)
+        os.replace(manifest, os.path.join(directory, 'current.json'))
+
+        # Older versions can go: processes that still map them keep their
+        # pages until they remap (unlinked files stay readable on POSIX).
+        for entry in os.listdir(directory):
+            if entry.startswith('v') and entry != f'v{version}':
+                shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+        return version
+
+
+def _rebuild_in_background():
+    if not _rebuilding.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            build_snapshot()
+        finally:
+            connection.close()
+            _rebuilding.release()
+
+    threading.Thread(target=run, name='similarity-snapshot', daemon=True).start()
+
+
+def get_snapshot():
+    """
+    The current CSRGraph, memory-mapped, or None when snapshots are
+    disabled or the published one is stale (a rebuild is then started).
+    """
+    global _loaded
+    directory = settings.SIMILARITY_SNAPSHOT_DIR
+    if not directory:
+        return None
+
+    version = get_similarity_version()
+    if _loaded is not None and _loaded[0] == version:
+        return _loaded[1]
+
+    manifest = _read_manifest(directory)
+    if manifest is None or manifest['version'] != version:
+        _rebuild_in_background()
+        return None
+
+    folder = os.path.join(directory, f"v{version}")
+    try:
+        arrays = [np.load(os.path.join(folder, f'{name}.npy'), mmap_mode='r') for name in ARRAYS]
+    except OSError:
+        # Replaced between reading the manifest and mapping; try next time
+        return None
+    _loaded = (version, CSRGraph(*arrays))
+    return _loaded[1]
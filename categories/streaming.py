@@ -0,0 +1,110 @@
+"""
+Streaming encoders for the category tree.
+
+Instead of materializing the nested dict forest and then the full JSON
+string, the tree is kept as a flat adjacency map (row tuples plus child
+id lists) and walked with an explicit stack, yielding JSON text as it
+goes. Depth is therefore bounded by memory, not by the recursion limit.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+# Yield to the WSGI server in chunks of roughly this many characters
+CHUNK_SIZE = 64 * 1024
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def build_adjacency(rows):
+    """
+    Takes (id, parent_id, ...) tuples and returns (nodes, children, roots)
+    with the same root/orphan rules as views.build_forest.
+    """
+    nodes = {}
+    for row in rows:
+        nodes[row[0]] = row
+
+    children = {}
+    roots = []
+    for item_id, row in nodes.items():
+        parent_id = row[1]
+        if parent_id is None or parent_id not in nodes:
+            roots.append(item_id)
+        elif parent_id != item_id:
+            children.setdefault(parent_id, []).append(item_id)
+    return nodes, children, roots
+
+
+def chunked(pieces):
+    buf, size = [], 0
+    for piece in pieces:
+        buf.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buf)
+            buf, size = [], 0
+    if buf:
+        yield ''.join(buf)
+
+
+def _node_head(fields, row):
+    # '{"id":1,...}' -> '{"id":1,...,"children":['
+    return _encode(dict(zip(fields, row)))[:-1] + ',"children":['
+
+
+def _iter_nested(fields, nodes, children, roots):
+    yield '['
+    stack = [iter(roots)]
+    first = [True]
+    while stack:
+        node_id = next(stack[-1], None)
+        if node_id is None:
+            stack.pop()
+            first.pop()
+            yield ']}' if stack else ']'
+            continue
+        if not first[-1]:
+            yield ','
+        first[-1] = False
+        yield _node_head(fields, nodes[node_id])
+        stack.append(iter(children.get(node_id, ())))
+        first.append(True)
+
+
+def _iter_ndjson(fields, nodes, children, roots):
+    # Pre-order, so every parent line precedes its children
+    stack = list(reversed(roots))
+    while stack:
+        node_id = stack.pop()
+        yield _encode(dict(zip(fields, nodes[node_id]))) + '\n'
+        stack.extend(reversed(children.get(node_id, ())))
+
+
+def iter_tree(rows, fields, fmt='json'):
+    """
+    `rows` are tuples in `fields` order, with id and parent_id first.
+    fmt='json' yields the nested forest, fmt='ndjson' one flat node per line.
+    """
+    nodes, children, roots = build_adjacency(rows)
+    encoder = _iter_ndjson if fmt == 'ndjson' else _iter_nested
+    return chunked(encoder(fields, nodes, children, roots))
+
+
+def stream_body(request, chunks):
+    """
+    Body for a StreamingHttpResponse. Under ASGI Django would list() a
+    sync iterator before sending anything, so there the chunks are pulled
+    one thread hop at a time; thread-sensitive, so server-side cursors
+    stay on the connection that opened them.
+    """
+    if not isinstance(getattr(request, '_request', request), ASGIRequest):
+        return chunks
+
+    async def pull():
+        next_chunk = sync_to_async(next)
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+
+    return pull()
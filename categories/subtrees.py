@@ -0,0 +1,248 @@
+"""
+Set-based subtree operations: batch move, deep copy and delete.
+
+Each runs as a few INSERT/UPDATE/DELETE ... SELECT statements over
+recursive CTEs in one transaction, so a 100k-node branch is never
+loaded into Python (Django's delete collector would fetch every
+descendant and link first). Descendants are found by walking parent_id,
+not the path index, so a stale path can never widen or narrow the set.
+As in bulk.py, signals do not fire: versions and dirty marks are kept
+explicitly, counters and the change log by the database triggers.
+"""
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+
+from .bulk import CATEGORY_TABLE, DIRTY_TABLE, EDGE_TABLE, copy_rows
+from .cache import bump_similarity_version, bump_tree_version
+from .models import Category, CategoryComponent
+
+# Ids of a node and everything below it. UNION stops on corrupted cycles.
+SUBTREE_IDS = f"""
+    WITH RECURSIVE subtree(id) AS (
+        SELECT id FROM {CATEGORY_TABLE} WHERE id = %s
+        UNION
+        SELECT c.id FROM {CATEGORY_TABLE} c JOIN subtree s ON c.parent_id = s.id
+    )
+    SELECT id FROM subtree
+"""
+
+
+def _temp_table(cursor, name, definition, params=None):
+    cursor.execute(f"DROP TABLE IF EXISTS {name}")
+    cursor.execute(f"CREATE TEMP TABLE {name} {definition}", params)
+
+
+def _drop(cursor, *names):
+    for name in names:
+        cursor.execute(f"DROP TABLE {name}")
+
+
+def move_subtrees(moves):
+    """
+    Re-parents many nodes at once. `moves` is an iterable of (id, new
+    parent id or None); nested moves (a node and one of its ancestors)
+    are fine. Returns how many nodes changed parent. Raises
+    ValidationError, leaving the tree untouched, on unknown or repeated
+    ids and on moves that would close a loop.
+    """
+    moves = list(moves)
+    ids = [pk for pk, _ in moves]
+    if len(set(ids)) != len(ids):
+        raise ValidationError("A category can only be moved once per batch.")
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        _temp_table(cursor, 'move_rows', "(id BIGINT, parent_id BIGINT)")
+        copy_rows(cursor, 'move_rows', ('id', 'parent_id'), moves)
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM move_rows m
+            WHERE NOT EXISTS (SELECT 1 FROM {CATEGORY_TABLE} c WHERE c.id = m.id)
+               OR (m.parent_id IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM {CATEGORY_TABLE} c WHERE c.id = m.parent_id))
+        """)
+        if cursor.fetchone()[0]:
+            raise ValidationError("Category or parent category does not exist.")
+
+        # Same protocol as the single move: the moved nodes plus the new
+        # parents' whole ancestry, locked in id order
+        cursor.execute(f"""
+            WITH RECURSIVE up(id, parent_id) AS (
+                SELECT id, parent_id FROM {CATEGORY_TABLE}
+                WHERE id IN (SELECT parent_id FROM move_rows)
+                UNION
+                SELECT c.id, c.parent_id FROM {CATEGORY_TABLE} c JOIN up ON c.id = up.parent_id
+            )
+            SELECT id FROM up
+        """)
+        Category.objects.lock_rows(ids + [row[0] for row in cursor.fetchall()])
+
+        cursor.execute(f"""
+            DELETE FROM move_rows WHERE EXISTS (
+                SELECT 1 FROM {CATEGORY_TABLE} c WHERE c.id = move_rows.id
+                AND (c.parent_id = move_rows.parent_id OR (c.parent_id IS NULL AND move_rows.parent_id IS NULL))
+            )
+        """)
+        cursor.execute("SELECT COUNT(*) FROM move_rows")
+        moved = cursor.fetchone()[0]
+        if not moved:
+            _drop(cursor, 'move_rows')
+            return 0
+
+        cursor.execute(f"""
+            UPDATE {CATEGORY_TABLE} SET parent_id = m.parent_id
+            FROM move_rows m WHERE {CATEGORY_TABLE}.id = m.id
+        """)
+
+        # Every ancestor of every moved node, on the new adjacency
+        _temp_table(cursor, 'move_up', f"""AS
+            WITH RECURSIVE up(start_id, id) AS (
+                SELECT id, parent_id FROM move_rows WHERE parent_id IS NOT NULL
+                UNION
+                SELECT u.start_id, c.parent_id FROM up u JOIN {CATEGORY_TABLE} c ON c.id = u.id
+                WHERE c.parent_id IS NOT NULL AND u.id <> u.start_id
+            )
+            SELECT start_id, id FROM up
+        """)
+        cursor.execute("SELECT COUNT(*) FROM move_up WHERE id = start_id")
+        if cursor.fetchone()[0]:
+            # Rolls the UPDATE back with the transaction
+            raise ValidationError("Circular dependency detected in category tree.")
+
+        # Re-derive path/depth top-down from the highest moved nodes, whose
+        # new parents sit outside every moved branch and are therefore current
+        _temp_table(cursor, 'move_tree', f"""AS
+            WITH RECURSIVE tree(id, path, depth) AS (
+                SELECT c.id, COALESCE(p.path || p.id || '/', '/'), COALESCE(p.depth + 1, 0)
+                FROM move_rows m
+                JOIN {CATEGORY_TABLE} c ON c.id = m.id
+                LEFT JOIN {CATEGORY_TABLE} p ON p.id = c.parent_id
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM move_up u JOIN move_rows o ON o.id = u.id WHERE u.start_id = m.id
+                )
+                UNION ALL
+                SELECT c.id, t.path || t.id || '/', t.depth + 1
+                FROM tree t JOIN {CATEGORY_TABLE} c ON c.parent_id = t.id
+            )
+            SELECT id, path, depth FROM tree
+        """)
+        cursor.execute("CREATE INDEX move_tree_id ON move_tree (id)")
+        cursor.execute(f"""
+            UPDATE {CATEGORY_TABLE} SET path = t.path, depth = t.depth
+            FROM move_tree t WHERE {CATEGORY_TABLE}.id = t.id
+        """)
+
+        _drop(cursor, 'move_rows', 'move_up', 'move_tree')
+        transaction.on_commit(bump_tree_version)
+    return moved
+
+
+def copy_subtree(category, parent_id=None, links=False):
+    """
+    Deep-copies `category` and its descendants under `parent_id` (None =
+    as a new root). With `links`, similarity links are copied too: links
+    inside the branch join the copies, links leaving it join the copy to
+    the same outside category. Returns {id, categories, links}, `id`
+    being the new top node.
+    """
+    if parent_id is None:
+        prefix, depth = '/', 0
+    else:
+        parent = Category.objects.filter(pk=parent_id).values('path', 'depth').first()
+        if parent is None:
+            raise ValidationError("Parent category does not exist.")
+        prefix, depth = f"{parent['path']}{parent_id}/", parent['depth'] + 1
+
+    stats = {'links': 0}
+    with transaction.atomic(), connection.cursor() as cursor:
+        _temp_table(cursor, 'copy_map', f"AS SELECT id AS old_id, CAST(NULL AS BIGINT) AS new_id FROM ({SUBTREE_IDS}) AS s",
+                    [category.pk])
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"UPDATE copy_map SET new_id = nextval(pg_get_serial_sequence('{CATEGORY_TABLE}', 'id'))")
+        else:
+            cursor.execute(f"UPDATE copy_map SET new_id = old_id + (SELECT MAX(id) FROM {CATEGORY_TABLE})")
+        cursor.execute("CREATE INDEX copy_map_old ON copy_map (old_id)")
+
+        _temp_table(cursor, 'copy_tree', f"""AS
+            WITH RECURSIVE tree(old_id, new_id, parent_id, path, depth) AS (
+                SELECT old_id, new_id, CAST(%s AS BIGINT), CAST(%s AS TEXT), CAST(%s AS INTEGER)
+                FROM copy_map WHERE old_id = %s
+                UNION ALL
+                SELECT m.old_id, m.new_id, t.new_id, t.path || t.new_id || '/', t.depth + 1
+                FROM tree t
+                JOIN {CATEGORY_TABLE} c ON c.parent_id = t.old_id
+                JOIN copy_map m ON m.old_id = c.id
+            )
+            SELECT * FROM tree
+        """, [parent_id, prefix, depth, category.pk])
+        cursor.execute(f"""
+            INSERT INTO {CATEGORY_TABLE} (id, name, description, image, parent_id, path, depth)
+            SELECT t.new_id, c.name, c.description, c.image, t.parent_id, t.path, t.depth
+            FROM copy_tree t JOIN {CATEGORY_TABLE} c ON c.id = t.old_id
+        """)
+        stats['categories'] = cursor.rowcount
+        cursor.execute("SELECT new_id FROM copy_tree WHERE old_id = %s", [category.pk])
+        stats['id'] = cursor.fetchone()[0]
+
+        if links:
+            # Internal links already come in both directions; UNION adds the
+            # reverse of the outgoing ones
+            _temp_table(cursor, 'copy_links', f"""AS
+                SELECT ma.new_id AS a, COALESCE(mb.new_id, e.to_category_id) AS b
+                FROM {EDGE_TABLE} e
+                JOIN copy_tree ma ON ma.old_id = e.from_category_id
+                LEFT JOIN copy_tree mb ON mb.old_id = e.to_category_id
+            """)
+            cursor.execute(f"""
+                INSERT INTO {EDGE_TABLE} (from_category_id, to_category_id)
+                SELECT a, b FROM copy_links UNION SELECT b, a FROM copy_links
+            """)
+            stats['links'] = cursor.rowcount // 2
+            cursor.execute(f"""
+                INSERT INTO {DIRTY_TABLE} (category_id)
+                SELECT id FROM (SELECT a AS id FROM copy_links UNION SELECT b FROM copy_links) AS d
+                WHERE true ON CONFLICT DO NOTHING
+            """)
+            _drop(cursor, 'copy_links')
+            transaction.on_commit(bump_similarity_version)
+
+        _drop(cursor, 'copy_map', 'copy_tree')
+        transaction.on_commit(bump_tree_version)
+    return stats
+
+
+def delete_subtree(category):
+    """
+    Deletes `category`, its descendants, their similarity links and
+    analysis memberships. Returns {categories, links}.
+    """
+    stats = {}
+    with transaction.atomic(), connection.cursor() as cursor:
+        Category.objects.lock_rows([category.pk])
+        _temp_table(cursor, 'delete_ids', f"AS {SUBTREE_IDS}", [category.pk])
+        cursor.execute("CREATE INDEX delete_ids_id ON delete_ids (id)")
+
+        # Like the pre_delete signal: the deleted nodes and their neighbours
+        cursor.execute(f"""
+            INSERT INTO {DIRTY_TABLE} (category_id)
+            SELECT id FROM (
+                SELECT id FROM delete_ids
+                UNION SELECT e.to_category_id FROM {EDGE_TABLE} e JOIN delete_ids d ON d.id = e.from_category_id
+            ) AS d
+            WHERE true ON CONFLICT DO NOTHING
+        """)
+        cursor.execute(f"""
+            DELETE FROM {EDGE_TABLE}
+            WHERE from_category_id IN (SELECT id FROM delete_ids)
+               OR to_category_id IN (SELECT id FROM delete_ids)
+        """)
+        stats['links'] = cursor.rowcount // 2
+        cursor.execute(f"""
+            DELETE FROM {CategoryComponent._meta.db_table}
+            WHERE category_id IN (SELECT id FROM delete_ids)
+        """)
+        cursor.execute(f"DELETE FROM {CATEGORY_TABLE} WHERE id IN (SELECT id FROM delete_ids)")
+        stats['categories'] = cursor.rowcount
+
+        _drop(cursor, 'delete_ids')
+        transaction.on_commit(bump_tree_version)
+        transaction.on_commit(bump_similarity_version)
+    return stats
@@ -0,0 +1,51 @@
+import io
+import json
+import pytest
+from django.core.management import call_command
+from categories.benchmarks import SCENARIOS, Scenarios, load_topology
+from categories.models import Category
+
+pytest.importorskip('pytest_benchmark')
+
+# Opt-in (pytest -m benchmark); small sizes, use `manage.py benchmark`
+# for real ones
+SIZE = 300
+LINKS = 1500
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+class TestBenchmarks:
+
+    @pytest.mark.parametrize('scenario', SCENARIOS)
+    def test_scenario(self, benchmark, scenario):
+        load_topology('random', seed=1, size=SIZE, links=LINKS)
+        runner = Scenarios(seed=1)
+        benchmark.extra_info.update(topology='random', size=SIZE, links=LINKS)
+        response = benchmark(getattr(runner, scenario))
+        assert response is None or response.status_code < 500
+
+    @pytest.mark.parametrize('topology, size, edges', [
+        ('random', 200, 500),
+        ('complete', 30, 30 * 29 // 2),
+        ('star', 200, 200 + 1),
+    ])
+    def test_topologies_are_seeded(self, topology, size, edges):
+        first = load_topology(topology, seed=7, size=size, links=500)
+        names = list(Category.objects.order_by('id').values_list('name', 'depth'))
+        assert first['links'] == edges and first['rejected'] == 0
+        load_topology(topology, seed=7, size=size, links=500)
+        assert list(Category.objects.order_by('id').values_list('name', 'depth')) == names
+
+    def test_benchmark_command_writes_json(self, tmp_path):
+        output = tmp_path / 'report.json'
+        call_command(
+            'benchmark', '--force', '--size', '100', '--links', '200', '--repeat', '2',
+            '--scenario', 'tree_build', '--scenario', 'path', '-o', str(output),
+            stdout=io.StringIO(),
+        )
+        report = json.loads(output.read_text())
+        assert report['loaded']['categories'] == 100
+        assert set(report['results']) == {'tree_build', 'path'}
+        assert report['results']['path']['runs'] == 2
+        assert report['connections']['pool'] is False
@@ -1,4 +1,6 @@
+import io
 import pytest
+from django.core.cache import cache
 from django.urls import reverse
 from rest_framework import status
 from categories.models import Category
@@ -6,7 +8,13 @@ from categories.tests.factories import CategoryFactory
 
 @pytest.mark.django_db
 class TestCategoryAPI:
-    
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self):
+        # Versions are bumped on commit, which never happens inside a test
+        # transaction; keep one test's cached tree out of the next
+        cache.clear()
+
     def test_arbitrarily_deep_tree(self, client):
         """Task: Categories can be nested arbitrarily deep."""
         c1 = CategoryFactory(name="Root")
@@ -20,8 +28,107 @@ class TestCategoryAPI:
         assert response.status_code == status.HTTP_200_OK
         # Verify the nesting in the response
         tree = response.json()
+        assert len(tree) == 1
         assert tree[0]['children'][0]['children'][0]['children'][0]['name'] == "Level 3"
 
+    def test_tree_is_cached_per_version(self, client, django_assert_num_queries,
+                                        django_capture_on_commit_callbacks):
+        """Unchanged trees come from cache / 304; any committed write invalidates."""
+        root = CategoryFactory(name="Root")
+        url = reverse('category-tree')
+
+        first = client.get(url)
+        etag = first['ETag']
+        with django_assert_num_queries(2):      # the shared version, one PK read each
+            assert client.get(url).content == first.content
+            assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        with django_capture_on_commit_callbacks(execute=True):
+            CategoryFactory(name="Child", parent=root)
+        fresh = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert fresh.status_code == status.HTTP_200_OK
+        assert fresh.json()[0]['children'][0]['name'] == "Child"
+
+        # Another worker, with its own empty local cache, agrees on the version
+        cache.clear()
+        assert client.get(url, HTTP_IF_NONE_MATCH=fresh['ETag']).status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_streamed_tree_matches_rendered_tree(self, client):
+        """?stream=json yields the same forest; ?stream=ndjson one node per line."""
+        import json
+
+        root = CategoryFactory(name="Root")
+        CategoryFactory(name="Child", parent=CategoryFactory(name="Branch", parent=root))
+        CategoryFactory(name="Other root")
+        url = reverse('category-tree')
+
+        streamed = client.get(url, {'stream': 'json'})
+        assert streamed.streaming
+        body = json.loads(b''.join(streamed.streaming_content))
+        assert body == client.get(url).json()
+
+        lines = b''.join(client.get(url, {'stream': 'ndjson'}).streaming_content).splitlines()
+        names = [json.loads(line)['name'] for line in lines]
+        assert names == ["Root", "Branch", "Child", "Other root"]
+        for value in ('0', 'false', 'xml'):
+            assert client.get(url, {'stream': value}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_subtree_with_depth_limit(self, client):
+        """Only the requested branch is returned, cut off at ?depth=N."""
+        root = CategoryFactory(name="Root")
+        branch = CategoryFactory(name="Branch", parent=root)
+        child = CategoryFactory(name="Child", parent=branch)
+        CategoryFactory(name="Grandchild", parent=child)
+        CategoryFactory(name="Sibling", parent=root)
+
+        url = reverse('category-subtree', kwargs={'pk': branch.id})
+        full = client.get(url).json()
+        assert full['name'] == "Branch"
+        assert full['children'][0]['children'][0]['name'] == "Grandchild"
+
+        cut = client.get(url, {'depth': 1}).json()
+        assert cut['children'][0]['name'] == "Child"
+        assert cut['children'][0]['children'] == []
+
+        assert client.get(url, {'depth': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_keyset_pagination(self, client, django_assert_num_queries):
+        """?pagination=cursor walks the list by id without COUNT(*)."""
+        created = CategoryFactory.create_batch(5)
+        url = reverse('category-list')
+
+        with django_assert_num_queries(1):
+            page = client.get(url, {'pagination': 'cursor', 'page_size': 2}).json()
+        assert 'count' not in page
+        seen = [item['id'] for item in page['results']]
+        while page['next']:
+            page = client.get(page['next']).json()
+            seen += [item['id'] for item in page['results']]
+        assert seen == [c.id for c in created]
+
+        counted = client.get(url, {'pagination': 'cursor', 'count': 'true'}).json()
+        assert counted['count'] == 5
+
+    def test_keyset_pagination_with_tied_ordering(self, client):
+        """Ordering by a counter pages through ties by id, each row once."""
+        a, b, c, d, e = CategoryFactory.create_batch(5)
+        a.similar_categories.add(b, c)
+        d.similar_categories.add(e)
+        url = reverse('category-list')
+
+        page = client.get(url, {'pagination': 'cursor', 'ordering': '-similar_count', 'page_size': 1}).json()
+        seen = [item['id'] for item in page['results']]
+        while page['next']:
+            page = client.get(page['next']).json()
+            seen += [item['id'] for item in page['results']]
+        assert seen == [a.id, b.id, c.id, d.id, e.id]
+
+        back = []
+        while page['previous']:
+            page = client.get(page['previous']).json()
+            back = [item['id'] for item in page['results']] + back
+        assert back == seen[:-1]
+
     def test_bidirectional_similarity_crud(self, client):
         """Task: Similarity is bidirectional (A->B implies B->A)."""
         cat_a = CategoryFactory()
@@ -39,6 +146,35 @@ class TestCategoryAPI:
         client.delete(url, {'target_id': cat_b.id}, content_type='application/json')
         assert cat_b not in cat_a.similar_categories.all()
 
+    def test_bulk_similarity_links(self, client):
+        """Bulk NDJSON/CSV linking reports added/skipped/rejected pairs."""
+        a, b, c = CategoryFactory(), CategoryFactory(), CategoryFactory()
+        a.similar_categories.add(b)
+        url = reverse('category-similarity-bulk')
+
+        body = '\n'.join([
+            f'{{"source": {a.id}, "target": {b.id}}}',   # already linked
+            f'[{c.id}, {a.id}]',
+            f'[{a.id}, {c.id}]',                         # repeated
+            f'[{a.id}, {a.id}]',                         # self-link
+            f'[{a.id}, 999999]',                         # unknown id
+            'not json',
+        ])
+        response = client.post(url, body, content_type='application/x-ndjson')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {'added': 1, 'skipped': 2, 'rejected': 3}
+        assert c in a.similar_categories.all()
+        assert a in c.similar_categories.all()
+
+        body = f'source,target\n{b.id},{a.id}\n{b.id},{c.id}\n'
+        response = client.delete(url, body, content_type='text/csv')
+        assert response.json() == {'removed': 1, 'skipped': 1, 'rejected': 0}
+        assert not a.similar_categories.filter(pk=b.pk).exists()
+        assert not b.similar_categories.filter(pk=a.pk).exists()
+
+        response = client.post(url, '1,2', content_type='text/plain')
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
     def test_move_category(self, client):
         """Task: Categories can be moved around in the tree."""
         root1 = CategoryFactory(name="Root 1")
@@ -52,17 +188,36 @@ class TestCategoryAPI:
         child.refresh_from_db()
         assert child.parent == root2
     
-    @pytest.mark.django_db
-    def test_circular_dependency_fails(api_client):
+    def test_ancestry_index_follows_moves(self):
+        """Moving a node re-roots the path/depth of its whole subtree."""
+        root1 = CategoryFactory(name="Root 1")
+        root2 = CategoryFactory(name="Root 2")
+        branch = CategoryFactory(name="Branch", parent=root1)
+        leaf = CategoryFactory(name="Leaf", parent=branch)
+        assert leaf.path == f"/{root1.id}/{branch.id}/"
+        assert leaf.depth == 2
+
+        branch.parent = CategoryFactory(name="Mid", parent=root2)
+        branch.save()
+
+        leaf.refresh_from_db()
+        assert leaf.ancestor_ids == [root2.id, branch.parent.id, branch.id]
+        assert leaf.depth == 3
+        assert set(Category.objects.descendants_of(root2)) == {branch.parent, branch, leaf}
+        assert not Category.objects.descendants_of(root1).exists()
+
+    def test_circular_dependency_fails(self, client):
         a = Category.objects.create(name="A")
         b = Category.objects.create(name="B", parent=a)
+        c = Category.objects.create(name="C", parent=b)
         
-        # Try to make A the child of B
+        # Try to make A the child of its grandchild C
         url = reverse('category-move', kwargs={'pk': a.id})
-        response = api_client.patch(url, {'parent_id': b.id}, format='json')
+        response = client.patch(url, {'parent_id': c.id}, content_type='application/json')
         
         assert response.status_code == 400
-        assert "Circular dependency" in response.data['error']
+        assert "Circular dependency" in response.json()['error']
+        assert set(Category.objects.ancestor_ids_of(c.id)) == {a.id, b.id, c.id}
         
     def test_rabbit_hole_algorithm(self):
         """
@@ -86,4 +241,564 @@ class TestCategoryAPI:
         
         path = nx.shortest_path(G, source=a.id, target=c.id)
         assert len(path) == 3 # 3 nodes = 2 hops
-        assert path == [a.id, b.id, c.id]
\ No newline at end of file
+        assert path == [a.id, b.id, c.id]
+
+    def test_shortest_path_api(self, client):
+        """Online rabbit hole: bidirectional BFS over the through-table."""
+        a, b, c, d, e, lonely = CategoryFactory.create_batch(6)
+        a.similar_categories.add(b, d)
+        b.similar_categories.add(c)
+        d.similar_categories.add(e)
+        e.similar_categories.add(c)
+
+        url = reverse('category-path', kwargs={'pk': a.id, 'target': c.id})
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()['hops'] == 2
+        assert [step['id'] for step in response.json()['path']] == [a.id, b.id, c.id]
+
+        assert client.get(url, {'max_hops': 1}).status_code == status.HTTP_404_NOT_FOUND
+        unreachable = reverse('category-path', kwargs={'pk': a.id, 'target': lonely.id})
+        assert client.get(unreachable).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_copied_links_are_symmetric(self, client):
+        """copy_links (the generators' loader) stores both directions."""
+        from django.db import connection
+        from categories.bulk import copy_links
+
+        center, *satellites = CategoryFactory.create_batch(4)
+        with connection.cursor() as cursor:
+            copy_links(cursor, [(center.id, s.id) for s in satellites])
+
+        url = reverse('category-path', kwargs={'pk': satellites[0].id, 'target': satellites[1].id})
+        assert client.get(url).json()['hops'] == 2
+        counts = dict(Category.objects.values_list('id', 'similar_count'))
+        assert counts == {center.id: 3, **{s.id: 1 for s in satellites}}
+
+    def test_one_way_links_are_repaired(self):
+        """Migration 0010 adds the reverse of links loaded one way only."""
+        from importlib import import_module
+        from django.db import connection
+        from categories.bulk import EDGE_TABLE, copy_rows
+        from categories.models import SimilarityDirtyNode
+
+        repair = import_module('categories.migrations.0010_symmetric_similarity_links')
+        center, *satellites = CategoryFactory.create_batch(3)
+        satellites[0].similar_categories.add(satellites[1])
+        with connection.cursor() as cursor:
+            copy_rows(cursor, EDGE_TABLE, ('from_category_id', 'to_category_id'),
+                      [(center.id, s.id) for s in satellites])
+            for statement in repair.REPAIR:
+                cursor.execute(statement)
+
+        counts = dict(Category.objects.values_list('id', 'similar_count'))
+        assert counts == {center.id: 2, satellites[0].id: 2, satellites[1].id: 2}
+        assert set(SimilarityDirtyNode.objects.values_list('category_id', flat=True)) >= {
+            center.id, *(s.id for s in satellites)
+        }
+
+    def test_path_api_uses_current_snapshot(self, client, settings, tmp_path, monkeypatch,
+                                            django_capture_on_commit_callbacks):
+        """A fresh memory-mapped snapshot serves paths; a stale one is bypassed."""
+        from categories import snapshot
+
+        settings.SIMILARITY_SNAPSHOT_DIR = str(tmp_path)
+        rebuilds = []
+        monkeypatch.setattr(snapshot, '_rebuild_in_background', lambda: rebuilds.append(1))
+        a, b, c = CategoryFactory.create_batch(3)
+        a.similar_categories.add(b)
+        b.similar_categories.add(c)
+
+        snapshot.build_snapshot()
+        graph = snapshot.get_snapshot()
+        assert graph is not None and sorted(graph.node_ids.tolist()) == [a.id, b.id, c.id]
+        url = reverse('category-path', kwargs={'pk': a.id, 'target': c.id})
+        assert client.get(url).json()['hops'] == 2
+
+        # A new link makes the snapshot stale once committed: the DB answers,
+        # a rebuild is queued
+        with django_capture_on_commit_callbacks(execute=True):
+            a.similar_categories.add(c)
+        assert snapshot.get_snapshot() is None
+        assert rebuilds
+        assert client.get(url).json()['hops'] == 1
+
+    def test_analyze_rabbits_store_is_incremental(self, client):
+        """Results are persisted; re-runs only recompute islands with changed links."""
+        from django.core.management import call_command
+        from categories.models import SimilarityComponent
+
+        a, b, c, d, e = CategoryFactory.create_batch(5)
+        a.similar_categories.add(b)
+        b.similar_categories.add(c)
+        d.similar_categories.add(e)
+        call_command('analyze_rabbits', stdout=io.StringIO())
+
+        untouched = SimilarityComponent.objects.get(members__category=d)
+        assert untouched.diameter_estimate == 1
+        hole = client.get(reverse('category-rabbit-hole')).json()
+        assert hole['diameter_estimate'] == 2
+        assert {step['id'] for step in hole['path']} == {a.id, b.id, c.id}
+
+        # Splitting a-b-c only touches that island
+        b.similar_categories.remove(c)
+        out = io.StringIO()
+        call_command('analyze_rabbits', stdout=out)
+        assert "Islands recomputed: 1" in out.getvalue()
+        assert SimilarityComponent.objects.get(members__category=d).pk == untouched.pk
+        assert SimilarityComponent.objects.count() == 2
+
+        assert client.get(reverse('category-component', kwargs={'pk': a.id})).json()['size'] == 2
+        # c lost its only link, so it no longer belongs to any island
+        response = client.get(reverse('category-component', kwargs={'pk': c.id}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_export_import_round_trip(self, client, tmp_path):
+        """A forest with links survives export -> wipe -> import, in both formats."""
+        from django.core.management import call_command
+
+        root = CategoryFactory(name="Root")
+        child = CategoryFactory(name="Child", parent=root)
+        leaf = CategoryFactory(name="Leaf, with comma", parent=child, description="multi\nline")
+        other = CategoryFactory(name="Other")
+        leaf.similar_categories.add(other)
+
+        def shape():
+            return sorted(
+                (c.name, c.parent.name if c.parent else None, c.depth, c.description,
+                 sorted(s.name for s in c.similar_categories.all()))
+                for c in Category.objects.all()
+            )
+
+        expected = shape()
+        for output, content_type in (('ndjson', 'application/x-ndjson'), ('csv', 'text/csv')):
+            response = client.get(reverse('category-export-categories'), {'output': output})
+            body = b''.join(response.streaming_content)
+            Category.objects.all().delete()
+
+            response = client.post(reverse('category-import-categories'), body, content_type=content_type)
+            assert response.status_code == status.HTTP_201_CREATED
+            assert response.json() == {'categories': 4, 'links': 1, 'rejected': 0}
+            assert shape() == expected
+            imported = Category.objects.get(name="Leaf, with comma")
+            assert list(Category.objects.ancestors_of(imported).values_list('name', flat=True)) == ["Root", "Child"]
+
+        # Records may come child-first; orphans and cycles are rejected
+        lines = [
+            '{"key": "b", "parent": "a", "name": "B"}',
+            '{"key": "a", "parent": null, "name": "A"}',
+            '{"key": "x", "parent": "y", "name": "X"}',
+            '{"key": "y", "parent": "x", "name": "Y"}',
+            '{"key": "z", "parent": "missing", "name": "Z"}',
+            '{"source": "a", "target": "b"}',
+            '{"source": "a", "target": "z"}',
+            '{"key": "a", "parent": null, "name": "Again"}',
+            '{"key": "n", "name": 5}',
+            '{"key": "l", "name": []}',
+            '{"key": "d", "name": "D", "description": {"x": 1}}',
+        ]
+        path = tmp_path / 'forest.ndjson'
+        path.write_text('\n'.join(lines))
+        out = io.StringIO()
+        call_command('import_categories', str(path), stdout=out)
+        assert "Imported 2 categories and 1 links" in out.getvalue()
+        assert "(8 records rejected)" in out.getvalue()
+        assert Category.objects.get(name="B").parent.name == "A"
+        assert not Category.objects.filter(name="Again").exists()
+
+    def test_counters_follow_every_write_path(self, client, django_assert_num_queries):
+        """child_count/similar_count are kept by triggers, bulk paths included."""
+        root = CategoryFactory(name="Root")
+        a = CategoryFactory(parent=root)
+        b = CategoryFactory(parent=root)
+        a.similar_categories.add(b)
+
+        def counts(category):
+            category.refresh_from_db()
+            return category.child_count, category.similar_count
+
+        assert counts(root) == (2, 0)
+        assert counts(a) == (0, 1)
+
+        # A stale in-memory copy must not overwrite the counters
+        root.name = "Renamed"
+        root.save()
+        a.parent = b
+        a.save()
+        assert counts(root) == (1, 0)
+        assert counts(b) == (1, 1)
+
+        client.post(
+            reverse('category-similarity-bulk'),
+            f'[{root.id}, {a.id}]\n[{root.id}, {b.id}]',
+            content_type='application/x-ndjson',
+        )
+        assert counts(root) == (1, 2)
+        a.delete()
+        assert counts(root) == (1, 1)
+        assert counts(b) == (0, 1)
+
+        with django_assert_num_queries(1):
+            data = client.get(reverse('category-detail', kwargs={'pk': b.id})).json()
+        assert (data['depth'], data['child_count'], data['similar_count']) == (1, 0, 1)
+
+        listed = client.get(reverse('category-list'), {'ordering': '-child_count'}).json()
+        assert listed['results'][0]['id'] == root.id
+
+    def test_admin_tree_loads_lazily(self, client, admin_user):
+        """The admin tree page embeds no rows; levels and search are JSON, paged."""
+        client.force_login(admin_user)
+        root = CategoryFactory(name="Root")
+        children = CategoryFactory.create_batch(3, parent=root)
+        target = CategoryFactory(name="Needle", parent=children[1])
+
+        page = client.get(reverse('admin:categories_category_tree'))
+        assert page.status_code == status.HTTP_200_OK
+        assert b"Needle" not in page.content
+
+        url = reverse('admin:categories_category_tree_children')
+        roots = client.get(url).json()
+        assert roots == {'results': [{'id': root.id, 'name': "Root", 'child_count': 3}], 'next': None}
+
+        first = client.get(url, {'parent': root.id, 'limit': 2}).json()
+        assert [n['id'] for n in first['results']] == [c.id for c in children[:2]]
+        rest = client.get(url, {'parent': root.id, 'limit': 2, 'after': first['next']}).json()
+        assert [n['id'] for n in rest['results']] == [children[2].id]
+        assert rest['next'] is None
+        for limit in ('0', '-1', 'x'):
+            assert client.get(url, {'limit': limit}).status_code == status.HTTP_400_BAD_REQUEST
+
+        hits = client.get(reverse('admin:categories_category_tree_search'), {'q': 'needl'}).json()['results']
+        assert [n['id'] for n in hits[0]['chain']] == [root.id, children[1].id, target.id]
+
+        changelist = client.get(reverse('admin:categories_category_changelist'))
+        assert reverse('admin:categories_category_tree').encode() in changelist.content
+
+        client.logout()
+        assert client.get(url).status_code == status.HTTP_302_FOUND
+
+    def test_admin_changelist_filters_by_level(self, client, admin_user):
+        """Level filter replaces the FK choice list; an id search is a pk hit."""
+        client.force_login(admin_user)
+        root = CategoryFactory(name="Root")
+        child = CategoryFactory(name="Child", parent=root)
+        CategoryFactory(name="Grandchild", parent=child)
+        url = reverse('admin:categories_category_changelist')
+
+        response = client.get(url, {'level': 'root'})
+        assert list(response.context['cl'].result_list) == [root]
+        assert [c.name for c in client.get(url, {'level': '2'}).context['cl'].result_list] == ["Grandchild"]
+        assert {c.name for c in client.get(url, {'level': 'child'}).context['cl'].result_list} == {"Child", "Grandchild"}
+
+        hits = client.get(url, {'q': str(child.id), 'level': 'child'}).context['cl'].result_list
+        assert child in hits
+        assert [c.name for c in client.get(url, {'q': 'grand'}).context['cl'].result_list] == ["Grandchild"]
+
+    def test_search_ranks_and_pages_by_keyset(self, client):
+        """Ranked search puts exact/prefix hits first; both modes page by cursor."""
+        exact = CategoryFactory(name="Rabbit")
+        starts = CategoryFactory(name="Rabbit hole")
+        inside = CategoryFactory(name="White rabbit")
+        CategoryFactory(name="Unrelated")
+        url = reverse('category-search')
+
+        ranked = client.get(url, {'q': 'rabbit'}).json()
+        assert [r['id'] for r in ranked['results']] == [exact.id, starts.id, inside.id]
+        assert ranked['next'] is None
+
+        seen, page = [], client.get(url, {'q': 'rabbit', 'page_size': 1}).json()
+        while True:
+            seen += [r['id'] for r in page['results']]
+            if not page['next']:
+                break
+            page = client.get(page['next']).json()
+        assert seen == [exact.id, starts.id, inside.id]
+
+        page = client.get(url, {'q': 'rab', 'prefix': 'true', 'page_size': 1}).json()
+        assert [r['name'] for r in page['results']] == ["Rabbit"]
+        assert [r['name'] for r in client.get(page['next']).json()['results']] == ["Rabbit hole"]
+
+        assert client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+        assert client.get(url, {'q': 'x', 'cursor': 'nope'}).status_code == status.HTTP_400_BAD_REQUEST
+        for page_size in ('0', '-1'):
+            assert client.get(url, {'q': 'x', 'page_size': page_size}).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_request_instrumentation(self, client, settings, caplog):
+        """Server-Timing on every response, Prometheus counters, query budget log."""
+        from categories.middleware import REGISTRY
+
+        REGISTRY.reset()
+        category = CategoryFactory()
+        url = reverse('category-detail', kwargs={'pk': category.id})
+
+        timing = client.get(url)['Server-Timing']
+        assert 'db;dur=' in timing and 'desc="1 queries"' in timing
+        assert 'serialize;dur=' in timing and 'total;dur=' in timing
+
+        settings.QUERY_BUDGET = 0
+        with caplog.at_level('WARNING', logger='categories.middleware'):
+            client.get(url)
+        assert f"GET {url} ran 1 queries (budget 0)" in caplog.text
+
+        metrics_url = reverse('metrics')
+        assert client.get(metrics_url).status_code == status.HTTP_404_NOT_FOUND
+        settings.METRICS_ENABLED = True
+        body = client.get(metrics_url).content.decode()
+        assert 'category_api_requests_total{view="category-detail",method="GET"} 2' in body
+        assert 'category_api_queries_total{view="category-detail",method="GET"} 2' in body
+        assert 'category_api_over_query_budget_total{view="category-detail",method="GET"} 1' in body
+
+    def test_async_read_path_matches_sync_views(self, client):
+        """The ASGI views serve the same payloads as the DRF ones."""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+        from categories.cache import get_tree_version
+
+        root = CategoryFactory(name="Root")
+        child = CategoryFactory(name="Child", parent=root)
+        leaf = CategoryFactory(name="Leaf", parent=child)
+        root.similar_categories.add(child)
+        child.similar_categories.add(leaf)
+        async_client = AsyncClient()
+
+        def aget(name, **kwargs):
+            return async_to_sync(async_client.get)(reverse(f'async-{name}', kwargs=kwargs or None))
+
+        get_tree_version()                  # seeded, as by any earlier request
+        tree = aget('category-tree')
+        assert tree.json() == client.get(reverse('category-tree')).json()
+        # Queries run in sync_to_async threads are counted too: version + rows
+        assert 'desc="2 queries"' in tree['Server-Timing']
+        sync_view = async_to_sync(async_client.get)(reverse('category-detail', kwargs={'pk': root.id}))
+        assert 'desc="1 queries"' in sync_view['Server-Timing']
+        assert 'desc="1 queries"' in aget('category-detail', pk=root.id)['Server-Timing']
+        not_modified = async_to_sync(async_client.get)(
+            reverse('async-category-tree'), headers={'If-None-Match': tree['ETag']},
+        )
+        assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+
+        sync_detail = client.get(reverse('category-detail', kwargs={'pk': child.id})).json()
+        assert aget('category-detail', pk=child.id).json() == sync_detail
+        assert aget('category-detail', pk=0).status_code == status.HTTP_404_NOT_FOUND
+
+        subtree = client.get(reverse('category-subtree', kwargs={'pk': root.id})).json()
+        assert aget('category-subtree', pk=root.id).json() == subtree
+
+        # Under ASGI the streamed bodies are async iterators, sent chunk by chunk
+        async def streamed(url, data):
+            response = await async_client.get(url, data)
+            assert response.is_async
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        for url, data in ((reverse('category-tree'), {'stream': 'ndjson'}),
+                          (reverse('category-export-categories'), {'output': 'csv'})):
+            expected = b''.join(client.get(url, data).streaming_content)
+            assert async_to_sync(streamed)(url, data) == expected
+
+        page = async_to_sync(async_client.get)(reverse('async-category-list'), {'page_size': 2}).json()
+        sync_page = client.get(reverse('category-list'), {'pagination': 'cursor', 'page_size': 2}).json()
+        assert page.keys() == sync_page.keys() and page['results'] == sync_page['results']
+        assert [r['id'] for r in page['results']] == [root.id, child.id] and page['previous'] is None
+        rest = async_to_sync(async_client.get)(page['next']).json()
+        assert [r['id'] for r in rest['results']] == [leaf.id] and rest['next'] is None
+        back = async_to_sync(async_client.get)(rest['previous']).json()
+        assert back['results'] == page['results'] and back['previous'] is None
+        assert aget('category-list').status_code == status.HTTP_200_OK
+        bad = async_to_sync(async_client.get)(reverse('async-category-list'), {'page_size': 0})
+        assert bad.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db(transaction=True)
+    def test_async_path_runs_off_the_sync_thread(self, client):
+        """The async path BFS uses an executor thread (and its own connection)."""
+        from asgiref.sync import async_to_sync
+        from django.test import AsyncClient
+
+        root = CategoryFactory(name="Root")
+        child = CategoryFactory(name="Child", parent=root)
+        leaf = CategoryFactory(name="Leaf", parent=child)
+        root.similar_categories.add(child)
+        child.similar_categories.add(leaf)
+
+        kwargs = {'pk': root.id, 'target': leaf.id}
+        path = client.get(reverse('category-path', kwargs=kwargs)).json()
+        response = async_to_sync(AsyncClient().get)(reverse('async-category-path', kwargs=kwargs))
+        assert response.json() == path and path['hops'] == 2
+
+    def test_values_fast_paths_match_serializers(self, client, rf):
+        """list/retrieve skip ModelSerializer but render the same JSON."""
+        from categories.serializers import CategoryDetailSerializer, CategorySerializer
+
+        root = CategoryFactory(name="Root")
+        child = CategoryFactory(name="Ünïcode", parent=root)
+        Category.objects.filter(pk=child.pk).update(image='categories/rabbit.png')
+        child.refresh_from_db()
+        request = rf.get('/')
+
+        detail = client.get(reverse('category-detail', kwargs={'pk': child.id}))
+        assert detail.json() == CategoryDetailSerializer(child, context={'request': request}).data
+        assert detail.json()['image'].startswith('http://testserver/')
+        assert client.get(reverse('category-detail', kwargs={'pk': 'abc'})).status_code == status.HTTP_404_NOT_FOUND
+
+        expected = CategorySerializer([root, child], many=True).data
+        assert client.get(reverse('category-list')).json()['results'] == expected
+        page = client.get(reverse('category-list'), {'pagination': 'cursor', 'page_size': 1}).json()
+        assert page['results'] == expected[:1]
+        assert client.get(page['next']).json()['results'] == expected[1:]
+
+    def test_change_feed(self, client):
+        """Every write path lands in the log once; mirrors page by cursor."""
+        url = reverse('category-changes')
+        head = client.get(url, {'since': 'latest'}).json()['cursor']
+
+        root = CategoryFactory(name="Root")
+        a = CategoryFactory(name="A", parent=root)
+        b = CategoryFactory(name="B")
+        a.name = "A2"
+        a.save()
+        a.save()                            # nothing changed, nothing logged
+        a.parent = b
+        a.save()
+        a.similar_categories.add(root)
+        a.similar_categories.remove(root)
+        client.post(
+            reverse('category-similarity-bulk'), f'[{b.id}, {root.id}]', content_type='application/x-ndjson',
+        )
+        client.post(reverse('category-import-categories'), '{"key": "n", "name": "New"}',
+                    content_type='application/x-ndjson')
+        new = Category.objects.get(name="New")
+        a_id = a.id
+        a.delete()
+
+        seen, categories, since = [], {}, head
+        while True:
+            page = client.get(url, {'since': since, 'page_size': 3}).json()
+            seen += [(c['action'], c['category_id'], c['ref_id']) for c in page['changes']]
+            categories.update({c['id']: c for c in page['categories']})
+            since = page['cursor']
+            if not page['next']:
+                break
+        assert seen == [
+            ('create', root.id, None), ('create', a_id, root.id), ('create', b.id, None),
+            ('update', a_id, None), ('move', a_id, b.id),
+            ('link', root.id, a_id), ('unlink', root.id, a_id),
+            ('link', root.id, b.id), ('create', new.id, None), ('delete', a_id, None),
+        ]
+        assert categories[root.id]['name'] == "Root" and categories[new.id]['name'] == "New"
+        assert a_id not in categories
+
+        assert client.get(url, {'since': since}).json() == {
+            'cursor': since, 'changes': [], 'categories': [], 'next': None,
+        }
+        assert client.get(url, {'since': 'nope'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db(transaction=True)
+    def test_change_feed_commit_order(self, client):
+        """A transaction that commits late is not skipped by a cursor."""
+        import threading
+        from django.db import connection, connections, transaction
+
+        if connection.vendor != 'postgresql':
+            pytest.skip("SQLite has a single writer")
+        url = reverse('category-changes')
+        head = client.get(url, {'since': 'latest'}).json()['cursor']
+        started, release = threading.Event(), threading.Event()
+
+        def slow_writer():
+            # Takes its transaction id first but logs after the fast one
+            try:
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT pg_current_xact_id()")
+                    started.set()
+                    release.wait(10)
+                    CategoryFactory(name="Slow")
+            finally:
+                connections.close_all()
+
+        def fast_writer():
+            try:
+                CategoryFactory(name="Fast")
+            finally:
+                connections.close_all()
+
+        slow = threading.Thread(target=slow_writer)
+        slow.start()
+        assert started.wait(10)
+        fast = threading.Thread(target=fast_writer)
+        fast.start()
+        fast.join(10)
+        assert not fast.is_alive()          # writers never wait on each other
+        page = client.get(url, {'since': head}).json()
+        assert page['changes'] == [] and page['cursor'] == head
+
+        release.set()
+        slow.join()
+        slow_id, fast_id = (Category.objects.get(name=name).id for name in ("Slow", "Fast"))
+        assert slow_id > fast_id
+        changes = client.get(url, {'since': head}).json()['changes']
+        assert [c['category_id'] for c in changes] == [slow_id, fast_id]
+
+    def test_subtree_batch_move_copy_delete(self, client, django_assert_max_num_queries):
+        """Move, copy and delete whole branches with set-based SQL."""
+        from categories.models import SimilarityDirtyNode
+
+        a = CategoryFactory(name="A")
+        a1 = CategoryFactory(name="A1", parent=a)
+        a11 = CategoryFactory(name="A11", parent=a1)
+        b = CategoryFactory(name="B")
+        b1 = CategoryFactory(name="B1", parent=b)
+        outside = CategoryFactory(name="Outside")
+        a1.similar_categories.add(a11, outside)
+
+        def state(*categories):
+            for category in categories:
+                category.refresh_from_db()
+            return [(c.parent_id, c.path, c.depth, c.child_count) for c in categories]
+
+        # Nested moves in one batch: B under A11, A1 to the top level
+        url = reverse('category-move-many')
+        response = client.patch(url, {'moves': [
+            {'id': b.id, 'parent_id': a11.id}, {'id': a1.id, 'parent_id': None},
+        ]}, content_type='application/json')
+        assert response.json() == {'moved': 2, 'unchanged': 0}
+        assert state(a1, a11, b, b1) == [
+            (None, '/', 0, 1),
+            (a1.id, f'/{a1.id}/', 1, 1),
+            (a11.id, f'/{a1.id}/{a11.id}/', 2, 1),
+            (b.id, f'/{a1.id}/{a11.id}/{b.id}/', 3, 0),
+        ]
+        assert state(a) == [(None, '/', 0, 0)]
+
+        cycle = client.patch(url, {'moves': [{'id': a1.id, 'parent_id': b1.id}]}, content_type='application/json')
+        assert cycle.status_code == status.HTTP_400_BAD_REQUEST
+        assert state(a1) == [(None, '/', 0, 1)]
+        assert client.patch(url, {'moves': [{'id': 0, 'parent_id': None}]},
+                            content_type='application/json').status_code == status.HTTP_400_BAD_REQUEST
+
+        # Copy A11's branch under A, with links: A1-A11 and A1-Outside
+        # both leave the branch, so the copy links to A1 and nothing else
+        copied = client.post(reverse('category-copy', kwargs={'pk': a11.id}),
+                             {'parent_id': a.id, 'links': True}, content_type='application/json')
+        assert copied.status_code == status.HTTP_201_CREATED
+        assert copied.json()['categories'] == 3 and copied.json()['links'] == 1
+        copy = Category.objects.get(pk=copied.json()['id'])
+        assert (copy.name, copy.parent_id, copy.depth, copy.child_count, copy.similar_count) == ("A11", a.id, 1, 1, 1)
+        assert [c.name for c in Category.objects.descendants_of(copy).order_by('depth')] == ["B", "B1"]
+        assert list(copy.similar_categories.all()) == [a1]
+        plain = client.post(reverse('category-copy', kwargs={'pk': a1.id}), {}, content_type='application/json').json()
+        assert plain['categories'] == 4 and plain['links'] == 0
+        assert Category.objects.get(pk=plain['id']).parent_id is None
+
+        # Delete A1's branch: four nodes, links to A11, Outside and the copy
+        SimilarityDirtyNode.objects.all().delete()
+        with django_assert_max_num_queries(15):
+            deleted = client.delete(reverse('category-subtree', kwargs={'pk': a1.id}))
+        assert deleted.json() == {'categories': 4, 'links': 3}
+        assert not Category.objects.filter(pk__in=[a1.id, a11.id, b.id, b1.id]).exists()
+        assert set(SimilarityDirtyNode.objects.values_list('category_id', flat=True)) >= {outside.id, copy.id}
+        outside.refresh_from_db()
+        copy.refresh_from_db()
+        assert (outside.similar_count, copy.similar_count) == (0, 0)
+
+        assert client.delete(reverse('category-detail', kwargs={'pk': a.id})).status_code == status.HTTP_204_NO_CONTENT
+        assert not Category.objects.filter(pk=copy.pk).exists()
@@ -0,0 +1,113 @@
+import random
+import time
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from categories.graph import CSREngine, CSRGraph, NetworkXEngine, PathSearchTimeout, bidirectional_bfs, sweep_islands
+
+
+def random_edges(n_nodes, n_edges, seed):
+    rng = random.Random(seed)
+    pairs = {tuple(sorted(rng.sample(range(1, n_nodes + 1), 2))) for _ in range(n_edges)}
+    # Store both directions, like the symmetrical M2M table does
+    src = [a for a, b in pairs] + [b for a, b in pairs]
+    dst = [b for a, b in pairs] + [a for a, b in pairs]
+    return np.array(src), np.array(dst)
+
+
+class TestCSRGraph:
+
+    def test_bfs_matches_networkx(self):
+        src, dst = random_edges(300, 400, seed=1)
+        G = nx.from_edgelist(zip(src.tolist(), dst.tolist()))
+        g = CSRGraph.from_edges(src, dst)
+
+        for source in (1, 17, 150):
+            if source not in G:
+                continue
+            order, levels = g.bfs(g.index_of(source))
+            got = dict(zip(g.node_ids[order].tolist(), levels.tolist()))
+            assert got == nx.single_source_shortest_path_length(G, source)
+
+    def test_islands_and_sweep_agree_with_networkx(self):
+        src, dst = random_edges(500, 300, seed=2)
+        csr, ref = CSREngine(src, dst), NetworkXEngine(src, dst)
+
+        islands = sorted(sorted(island.tolist()) for island in csr.islands())
+        assert islands == sorted(sorted(island) for island in ref.islands())
+
+        G = ref.G
+        for island in csr.islands():
+            start_ecc, max_dist, path, _, _ = csr.sweep(island)
+            # The returned path is a real shortest path of the claimed length
+            assert len(path) == max_dist + 1
+            assert nx.shortest_path_length(G, path[0], path[-1]) == max_dist
+            assert all(G.has_edge(a, b) for a, b in zip(path, path[1:]))
+            assert start_ecc <= max_dist
+
+    def test_islands_around_seeds(self):
+        # Two islands: 1-2-3 and 10-11; seed 99 is not in the graph
+        src, dst = np.array([1, 2, 10]), np.array([2, 3, 11])
+        islands = CSREngine(src, dst).islands(seeds={3, 99})
+        assert [sorted(island.tolist()) for island in islands] == [[1, 2, 3]]
+
+    def test_parallel_sweep_matches_serial(self):
+        src, dst = random_edges(400, 250, seed=3)
+        engine = CSREngine(src, dst)
+        islands = engine.islands()
+        assert sweep_islands(engine, islands, workers=3) == sweep_islands(engine, islands)
+
+    def test_exact_diameter_is_certified(self):
+        src, dst = random_edges(200, 260, seed=4)
+        G = nx.from_edgelist(zip(src.tolist(), dst.tolist()))
+        for engine in (CSREngine(src, dst), NetworkXEngine(src, dst)):
+            for island in engine.islands():
+                result = engine.sweep(island, exact=True)
+                assert result.diameter == result.upper == nx.diameter(G.subgraph(map(int, island)))
+                assert len(result.path) == result.diameter + 1
+
+    def test_exact_diameter_respects_bfs_budget(self):
+        # A cycle: every node has the same eccentricity, the worst case for iFUB
+        n = 40
+        src = np.arange(1, n + 1)
+        dst = np.roll(src, -1)
+        engine = CSREngine(src, dst)
+        island = engine.islands()[0]
+        capped = engine.sweep(island, exact=True, max_bfs=4)
+        assert capped.bfs_runs == 4
+        assert capped.diameter <= n // 2 <= capped.upper
+        assert engine.sweep(island, exact=True).diameter == n // 2
+
+
+class TestBidirectionalBFS:
+
+    def expander(self, G):
+        def expand(nodes):
+            for node in nodes:
+                for neighbour in G[node]:
+                    yield node, neighbour
+        return expand
+
+    def test_matches_networkx_shortest_path_length(self):
+        src, dst = random_edges(300, 450, seed=5)
+        G = nx.from_edgelist(zip(src.tolist(), dst.tolist()))
+        nodes = sorted(G)
+        rng = random.Random(5)
+        for _ in range(50):
+            s, t = rng.sample(nodes, 2)
+            path = bidirectional_bfs(self.expander(G), s, t)
+            if nx.has_path(G, s, t):
+                assert len(path) - 1 == nx.shortest_path_length(G, s, t)
+                assert path[0] == s and path[-1] == t
+                assert all(G.has_edge(a, b) for a, b in zip(path, path[1:]))
+            else:
+                assert path is None
+
+    def test_hop_limit_and_deadline(self):
+        G = nx.path_graph(10)
+        assert bidirectional_bfs(self.expander(G), 0, 9, max_hops=8) is None
+        assert len(bidirectional_bfs(self.expander(G), 0, 9, max_hops=9)) == 10
+        with pytest.raises(PathSearchTimeout):
+            bidirectional_bfs(self.expander(G), 0, 9, deadline=time.monotonic() - 1)
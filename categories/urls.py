@@ -1,7 +1,19 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from . import async_views
+from .middleware import metrics_view
 from .views import CategoryViewSet
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = router.urls + [
+    path('metrics/', metrics_view, name='metrics'),
+    # Async read path (ASGI), same payloads as the viewset
+    path('async/categories/', async_views.category_list, name='async-category-list'),
+    path('async/categories/tree/', async_views.category_tree, name='async-category-tree'),
+    path('async/categories/<int:pk>/', async_views.category_detail, name='async-category-detail'),
+    path('async/categories/<int:pk>/subtree/', async_views.category_subtree, name='async-category-subtree'),
+    path('async/categories/<int:pk>/path/<int:target>/', async_views.category_path,
+         name='async-category-path'),
+]
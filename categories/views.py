@@ -1,23 +1,150 @@
+import binascii
+import json
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from drf_spectacular.utils import extend_schema, OpenApiParameter, inline_serializer
-from rest_framework import serializers, viewsets, status, decorators
-from drf_spectacular.utils import extend_schema, OpenApiParameter, inline_serializer
-from rest_framework import serializers, viewsets, status, decorators
+from rest_framework import serializers, viewsets, status, decorators, generics
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from django.shortcuts import get_object_or_404
-from django.shortcuts import get_object_or_404
-from .models import Category
-from .serializers import CategoryDetailSerializer, CategorySerializer
-from rest_framework.pagination import PageNumberPagination
+from .bulk import apply_similarity_pairs, export_forest, import_forest, parse_pairs, parse_records
+from .cache import get_cached_tree, get_tree_version, set_cached_tree, tree_etag
+from .graph import PathSearchTimeout, bidirectional_bfs
+from .middleware import ServerTimingMixin
+from .models import Category, CategoryChange, SimilarityComponent
+from .renderers import ORJSONRenderer
+from .serializers import (
+    DETAIL_FIELDS, LIST_FIELDS, CategoryDetailSerializer, CategorySerializer,
+    SimilarityComponentSerializer, detail_row, list_rows,
+)
+from .snapshot import get_snapshot
+from .streaming import chunked, iter_tree, stream_body
+from .subtrees import copy_subtree, delete_subtree, move_subtrees
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
 
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
 
+# Columns the tree endpoints emit per node
+TREE_FIELDS = ('id', 'name', 'parent_id', 'description', 'image')
+# Same columns, ordered the way streaming.iter_tree expects them
+STREAM_FIELDS = ('id', 'parent_id', 'name', 'description', 'image')
+# Nodes per level page / search hits in the admin tree
+ADMIN_TREE_PAGE_SIZE = 100
+ADMIN_TREE_SEARCH_LIMIT = 20
+# Search results per page
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+# Change feed entries per page
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
+# Content types accepted by similarity/bulk and import
+BULK_FORMATS = {'application/x-ndjson': 'ndjson', 'text/csv': 'csv'}
+
+
+def build_forest(rows):
+    """
+    Dict-based tree assembly shared by the tree endpoints.
+    Takes flat rows (dicts with id/parent_id) and returns the list of roots.
+    Rows whose parent is not part of `rows` become roots, which is what
+    makes the same code work for a subtree slice.
+    """
+    # We use a dict for O(1) access
+    nodes = {item['id']: {**item, 'children': []} for item in rows}
+
+    roots = []
+    for item_id, node in nodes.items():
+        parent_id = node['parent_id']
+        if parent_id is None:
+            roots.append(node)
+        # If the parent exists in our map, attach this node as a child
+        elif parent_id in nodes:
+            # Circular dependency guard: don't attach if it creates a loop
+            if parent_id != item_id:
+                nodes[parent_id]['children'].append(node)
+        else:
+            # Parent ID exists but node doesn't (Orphan), treat as root
+            roots.append(node)
+    return roots
+
+
+def encode_cursor(value, last_id):
+    return urlsafe_b64encode(json.dumps([value, last_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(sort key, id) of the last row seen, or None for the first page."""
+    if not cursor:
+        return None
+    try:
+        value, last_id = json.loads(urlsafe_b64decode(cursor.encode()))
+    except (TypeError, binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(cursor) from e
+    if not isinstance(value, (str, int, float)) or not isinstance(last_id, int):
+        raise ValueError(cursor)
+    return value, last_id
+
+
+def find_similarity_path(source, target, max_hops, timeout):
+    """
+    Shortest similarity chain as a list of ids, or None beyond max_hops.
+    Uses the memory-mapped snapshot when current. Raises PathSearchTimeout.
+    """
+    snapshot = get_snapshot()
+    expand = snapshot.expand if snapshot is not None else Category.objects.similarity_edges_from
+    return bidirectional_bfs(
+        expand, source, target,
+        max_hops=max_hops, deadline=time.monotonic() + timeout,
+    )
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 50
     page_size_query_param = 'page_size'
     max_page_size = 1000
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key: every page is
+    `WHERE id > <last id> ORDER BY id LIMIT n`, so deep pages cost the
+    same as the first one. No COUNT(*) unless asked for with ?count=true.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        # ?ordering= may sort on a counter shared by many rows; id behind it
+        # makes the order total, so tied rows cannot repeat or go missing
+        # between pages
+        ordering = tuple(super().get_ordering(request, queryset, view))
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            ordering += ('id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get('count') in ('1', 'true'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data = {'count': self.count, **response.data}
+        return response
+
+class CategoryViewSet(ServerTimingMixin, viewsets.ModelViewSet):
     queryset = Category.objects.select_related('parent').all().order_by('id')
     # serializer_class = CategorySerializer # no need for now as it will overflow
     def get_serializer_class(self):
@@ -28,84 +155,149 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return CategorySerializer
 
     pagination_class = StandardResultsSetPagination
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+    # ?ordering=-similar_count etc. reads the stored counters, no aggregation
+    filter_backends = [OrderingFilter]
+    ordering_fields = ['id', 'name', 'depth', 'child_count', 'similar_count']
+    ordering = ['id']
+
+    @property
+    def paginator(self):
+        # ?pagination=cursor switches the list to keyset paging; the next/
+        # previous links carry the parameter along.
+        query_params = getattr(self.request, 'query_params', {})
+        if not hasattr(self, '_paginator') and query_params.get('pagination') == 'cursor':
+            self._paginator = KeysetPagination()
+        return super().paginator
 
     def get_queryset(self):
-        # Optimization: Only load similarity IDs for the detail view
-        # to avoid massive joins on the list view.
-        if self.action == 'retrieve':
-            return Category.objects.prefetch_related('similar_categories')
+        # Counts come from the stored counters, so neither view needs to
+        # touch the similarity table.
         return Category.objects.all().order_by('id')
 
-    @extend_schema(summary="Get the full arbitrarily deep category tree")
-    def get_serializer_class(self):
-        queryset = Category.objects.select_related('parent').all().order_by('id')
-        # serializer_class = CategorySerializer # no need for now as it will overflow
-   
-        if self.action == 'retrieve':
-            # Use the one that includes counts/details
-            return CategoryDetailSerializer
-        # Use the slim one for 'list', 'create', 'update', etc.
-        return CategorySerializer
+    def list(self, request, *args, **kwargs):
+        # values() rows instead of CategorySerializer: same JSON, no
+        # model instances (the serializer stays for the schema and writes)
+        fields = LIST_FIELDS
+        if isinstance(self.paginator, KeysetPagination):
+            # The cursor is read off the last row, so it needs the sort keys
+            fields += tuple(f for f in self.ordering_fields if f not in LIST_FIELDS)
+        queryset = self.filter_queryset(self.get_queryset()).values(*fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            if fields is not LIST_FIELDS:
+                page = [{f: row[f] for f in LIST_FIELDS} for row in page]
+            return self.get_paginated_response(list_rows(page))
+        return Response(list_rows(list(queryset)))
 
-    pagination_class = StandardResultsSetPagination
+    def retrieve(self, request, *args, **kwargs):
+        # DRF's get_object_or_404: a malformed pk is a 404, not a 500
+        row = generics.get_object_or_404(self.get_queryset().values(*DETAIL_FIELDS), pk=kwargs['pk'])
+        return Response(detail_row(row, request))
 
-    def get_queryset(self):
-        # Optimization: Only load similarity IDs for the detail view
-        # to avoid massive joins on the list view.
-        if self.action == 'retrieve':
-            return Category.objects.prefetch_related('similar_categories')
-        return Category.objects.all().order_by('id')
-
-    @extend_schema(summary="Get the full arbitrarily deep category tree")
+    @extend_schema(
+        summary="Get the full arbitrarily deep category tree",
+        parameters=[
+            OpenApiParameter(
+                'stream', str, required=False, enum=['json', 'ndjson'],
+                description="Stream the tree instead of rendering it in one go: "
+                            "nested JSON, or one node per line (pre-order) as NDJSON",
+            ),
+        ],
+    )
     @decorators.action(detail=False, methods=['get'])
     def tree(self, request):
         """
         High-performance tree assembly. 
         Bypasses DRF Serializers to avoid Recursion 500s.
-        High-performance tree assembly. 
-        Bypasses DRF Serializers to avoid Recursion 500s.
+        The rendered bytes are cached per tree version, and the version
+        doubles as the ETag so unchanged trees answer 304 without a query.
         """
-        # 1. Fetch data leanly (No similarity prefetching here!)
-        queryset = Category.objects.all().values('id', 'name', 'parent_id', 'description', 'image')
-        # 1. Fetch data leanly (No similarity prefetching here!)
-        queryset = Category.objects.all().values('id', 'name', 'parent_id', 'description', 'image')
-        
-        # 2. Create a lookup map
-        # We use a dict for O(1) access
-        nodes = {item['id']: {**item, 'children': []} for item in queryset}
-        # 2. Create a lookup map
-        # We use a dict for O(1) access
-        nodes = {item['id']: {**item, 'children': []} for item in queryset}
-        
-        roots = []
-        for item_id, node in nodes.items():
-            parent_id = node['parent_id']
-            if parent_id is None:
-                roots.append(node)
-        for item_id, node in nodes.items():
-            parent_id = node['parent_id']
-            if parent_id is None:
-                roots.append(node)
-            else:
-                # If the parent exists in our map, attach this node as a child
-                if parent_id in nodes:
-                    # Circular dependency guard: don't attach if it creates a loop
-                    if parent_id != item_id:
-                        nodes[parent_id]['children'].append(node)
-                else:
-                    # Parent ID exists but node doesn't (Orphan), treat as root
-                    roots.append(node)
-
-                # If the parent exists in our map, attach this node as a child
-                if parent_id in nodes:
-                    # Circular dependency guard: don't attach if it creates a loop
-                    if parent_id != item_id:
-                        nodes[parent_id]['children'].append(node)
-                else:
-                    # Parent ID exists but node doesn't (Orphan), treat as root
-                    roots.append(node)
-
-        return Response(roots)
+        stream = request.query_params.get('stream')
+        if stream:
+            if stream not in ('json', 'ndjson'):
+                return Response({"error": "stream must be 'json' or 'ndjson'."}, status=400)
+            return self._stream_tree(stream)
+
+        # Read the version before the rows: a write landing in between
+        # bumps it, so a payload built from older rows is never served.
+        version = get_tree_version()
+        etag = tree_etag(version)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        payload = get_cached_tree(version)
+        if payload is None:
+            # Fetch data leanly (No similarity prefetching here!)
+            queryset = Category.objects.all().values(*TREE_FIELDS)
+            payload = ORJSONRenderer().render(build_forest(queryset))
+            set_cached_tree(version, payload)
+
+        response = HttpResponse(payload, content_type='application/json')
+        response['ETag'] = etag
+        # Let clients keep the body but revalidate on every use
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def _stream_tree(self, fmt):
+        """
+        Low-memory mode: rows are pulled through a server-side cursor and
+        JSON is yielded in chunks, so neither the nested forest nor the full
+        body string ever exists. Bypasses the tree cache on purpose.
+        """
+        rows = Category.objects.order_by('id').values_list(*STREAM_FIELDS).iterator(chunk_size=5000)
+        content_type = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+        return StreamingHttpResponse(
+            stream_body(self.request, iter_tree(rows, STREAM_FIELDS, fmt)), content_type=content_type,
+        )
+
+    def perform_destroy(self, instance):
+        # Set-based instead of the delete collector, which would load the
+        # whole branch and its links into memory
+        delete_subtree(instance)
+
+    @extend_schema(
+        methods=['GET'],
+        summary="Get the subtree under a category",
+        parameters=[
+            OpenApiParameter(
+                'depth', int, required=False,
+                description="Levels below the node to include (omit for all)",
+            ),
+        ],
+    )
+    @extend_schema(
+        methods=['DELETE'],
+        summary="Delete a category with its whole subtree",
+        description="Same as DELETE /api/categories/{id}/, but answers with what was removed.",
+    )
+    @decorators.action(detail=True, methods=['get', 'delete'])
+    def subtree(self, request, pk=None):
+        """
+        One branch instead of the whole forest: a single range scan on the
+        path index, cut off by the stored depth, then the same assembly.
+        DELETE removes the branch with set-based SQL (see subtrees.py).
+        """
+        category = get_object_or_404(Category, pk=pk)
+        if request.method == 'DELETE':
+            return Response(delete_subtree(category))
+
+        queryset = Category.objects.descendants_of(category, include_self=True)
+
+        depth = request.query_params.get('depth')
+        if depth is not None:
+            try:
+                depth = int(depth)
+                if depth < 0:
+                    raise ValueError
+            except ValueError:
+                return Response({"error": "depth must be a non-negative integer."}, status=400)
+            queryset = queryset.filter(depth__lte=category.depth + depth)
+
+        roots = build_forest(queryset.values(*TREE_FIELDS))
+        return Response(roots[0])
 
     @extend_schema(
         summary="Move a category to a new parent",
@@ -125,13 +317,95 @@ class CategoryViewSet(viewsets.ModelViewSet):
         if category.parent_id == new_parent_id:
             return Response(CategorySerializer(category).data)
 
+        with transaction.atomic():
+            # Lock the moved node plus the new parent's whole ancestry (one
+            # recursive query), so two concurrent moves cannot each pass the
+            # check against the other's stale parent and close a loop.
+            ancestry = []
+            if new_parent_id is not None:
+                ancestry = Category.objects.ancestor_ids_of(new_parent_id)
+                if not ancestry:
+                    return Response({"error": "Parent category does not exist."}, status=400)
+            Category.objects.lock_rows([category.pk, *ancestry])
+
+            # Re-read under the locks: a mover we waited for may have
+            # changed either side.
+            category.refresh_from_db()
+            if new_parent_id is not None and category.pk in Category.objects.ancestor_ids_of(new_parent_id):
+                return Response({"error": "Circular dependency detected in category tree."}, status=400)
+
+            try:
+                category.parent_id = new_parent_id
+                category.save() # This triggers the clean() method we added above
+            except ValidationError as e:
+                return Response({"error": str(e.detail[0])}, status=400)
+
+        return Response(CategorySerializer(category).data)
+
+    @extend_schema(
+        summary="Move many categories to new parents in one transaction",
+        request=inline_serializer(
+            name='MoveManySerializer',
+            fields={'moves': serializers.ListField(child=inline_serializer(
+                name='MoveItemSerializer',
+                fields={
+                    'id': serializers.IntegerField(),
+                    'parent_id': serializers.IntegerField(allow_null=True),
+                },
+            ))},
+        ),
+    )
+    @decorators.action(detail=False, methods=['patch'], url_path='move')
+    def move_many(self, request):
+        """
+        All moves apply together or not at all; path/depth of every moved
+        branch are re-derived in one recursive UPDATE.
+        """
+        moves = request.data.get('moves') if isinstance(request.data, dict) else None
+        if not isinstance(moves, list):
+            return Response({"error": "moves must be a list of {id, parent_id} objects."}, status=400)
+        try:
+            pairs = [(int(move['id']), None if move.get('parent_id') is None else int(move['parent_id']))
+                     for move in moves]
+        except (TypeError, KeyError, ValueError):
+            return Response({"error": "moves must be a list of {id, parent_id} objects."}, status=400)
+
         try:
-            category.parent_id = new_parent_id
-            category.save() # This triggers the clean() method we added above
+            moved = move_subtrees(pairs)
         except ValidationError as e:
-            return Response({"error": e.message}, status=400)
+            return Response({"error": str(e.detail[0])}, status=400)
+        return Response({"moved": moved, "unchanged": len(pairs) - moved})
 
-        return Response(CategorySerializer(category).data)
+    @extend_schema(
+        summary="Deep-copy a category and its subtree",
+        request=inline_serializer(
+            name='CopySubtreeSerializer',
+            fields={
+                'parent_id': serializers.IntegerField(
+                    allow_null=True, required=False,
+                    help_text="Parent of the copy (null = new root; default: same parent)",
+                ),
+                'links': serializers.BooleanField(
+                    required=False, help_text="Copy similarity links too (default false)",
+                ),
+            },
+        ),
+    )
+    @decorators.action(detail=True, methods=['post'])
+    def copy(self, request, pk=None):
+        category = get_object_or_404(Category, pk=pk)
+        parent_id = request.data.get('parent_id', category.parent_id)
+        links = request.data.get('links', False) in (True, 'true', '1')
+        try:
+            parent_id = None if parent_id is None else int(parent_id)
+        except (TypeError, ValueError):
+            return Response({"error": "parent_id must be an integer or null."}, status=400)
+
+        try:
+            stats = copy_subtree(category, parent_id, links=links)
+        except ValidationError as e:
+            return Response({"error": str(e.detail[0])}, status=400)
+        return Response(stats, status=status.HTTP_201_CREATED)
 
     @extend_schema(
         methods=['POST'],
@@ -163,13 +437,280 @@ class CategoryViewSet(viewsets.ModelViewSet):
             category.similar_categories.remove(target)
             return Response({"status": "unlinked"}, status=status.HTTP_204_NO_CONTENT)
 
+    @extend_schema(
+        summary="Link (POST) or unlink (DELETE) many category pairs at once",
+        description=(
+            "Body is NDJSON (`application/x-ndjson`, one `{\"source\": 1, \"target\": 2}` "
+            "or `[1, 2]` per line) or CSV (`text/csv`, `1,2` per line, optional header). "
+            "Pairs are streamed into a temp table and applied set-based in both directions."
+        ),
+        request={'application/x-ndjson': bytes, 'text/csv': bytes},
+    )
+    @decorators.action(detail=False, methods=['post', 'delete'], url_path='similarity/bulk')
+    def similarity_bulk(self, request):
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type not in BULK_FORMATS:
+            return Response(
+                {"error": "Send application/x-ndjson or text/csv."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        # Read the body line by line instead of through request.data
+        lines = request.stream if request.stream is not None else []
+        pairs = parse_pairs(lines, BULK_FORMATS[content_type])
+        return Response(apply_similarity_pairs(pairs, unlink=request.method == 'DELETE'))
+
+    @extend_schema(
+        summary="Import a forest plus similarity links",
+        description=(
+            "NDJSON (`application/x-ndjson`) or CSV (`text/csv`) in the export format. "
+            "Parents are resolved by key, in any order; everything is loaded in one transaction."
+        ),
+        request={'application/x-ndjson': bytes, 'text/csv': bytes},
+    )
+    @decorators.action(detail=False, methods=['post'], url_path='import')
+    def import_categories(self, request):
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type not in BULK_FORMATS:
+            return Response(
+                {"error": "Send application/x-ndjson or text/csv."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        lines = request.stream if request.stream is not None else []
+        stats = import_forest(parse_records(lines, BULK_FORMATS[content_type]))
+        return Response(stats, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Export the whole forest plus similarity links",
+        parameters=[
+            OpenApiParameter('output', str, required=False, enum=['ndjson', 'csv'],
+                             description="Streamed format (default ndjson)"),
+        ],
+    )
+    @decorators.action(detail=False, methods=['get'], url_path='export')
+    def export_categories(self, request):
+        fmt = 'csv' if request.query_params.get('output') == 'csv' else 'ndjson'
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        return StreamingHttpResponse(stream_body(request, chunked(export_forest(fmt))), content_type=content_type)
+
+    @extend_schema(
+        summary="Search categories by name",
+        parameters=[
+            OpenApiParameter('q', str, required=True, description="Text to look for"),
+            OpenApiParameter('prefix', bool, required=False,
+                             description="Autocomplete: names starting with q, alphabetical"),
+            OpenApiParameter('cursor', str, required=False, description="Opaque cursor from `next`"),
+            OpenApiParameter('page_size', int, required=False, description=f"Max {SEARCH_MAX_PAGE_SIZE}"),
+        ],
+    )
+    @decorators.action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Ranked (or prefix) name search, keyset-paged on (rank, id) or
+        (name, id): the cursor carries the last row's sort key, so a page
+        filters past it instead of skipping an OFFSET. The order itself is
+        a sort over the matched rows (rank is computed per query), so
+        deep pages still pay for the whole match set.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required."}, status=400)
+        prefix = request.query_params.get('prefix') in ('1', 'true')
+        try:
+            page_size = min(int(request.query_params.get('page_size', SEARCH_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE)
+            after = decode_cursor(request.query_params.get('cursor'))
+            if page_size < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "Invalid page_size or cursor."}, status=400)
+
+        queryset = Category.objects.search(query, prefix=prefix)
+        key = 'name' if prefix else 'rank'
+        if after is not None:
+            value, last_id = after
+            if prefix:
+                queryset = queryset.filter(Q(name__gt=value) | Q(name=value, id__gt=last_id))
+            else:
+                queryset = queryset.filter(Q(rank__lt=value) | Q(rank=value, id__gt=last_id))
+
+        fields = ('id', 'name', 'parent_id', 'depth', 'child_count') + (() if prefix else ('rank',))
+        rows = list(queryset.values(*fields)[:page_size + 1])
+        next_url = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            cursor = encode_cursor(rows[-1][key], rows[-1]['id'])
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+        return Response({'results': rows, 'next': next_url})
+
+    @extend_schema(
+        summary="Changes to the hierarchy and similarity links since a cursor",
+        parameters=[
+            OpenApiParameter('since', str, required=False,
+                             description="`cursor` of the previous page (default: from the start), "
+                                         "or `latest` for the current head"),
+            OpenApiParameter('page_size', int, required=False, description=f"Max {CHANGES_MAX_PAGE_SIZE}"),
+        ],
+    )
+    @decorators.action(detail=False, methods=['get'])
+    def changes(self, request):
+        """
+        Incremental sync for mirrors: take `?since=latest`, download /tree/,
+        then replay changes from that cursor. Entries come in (transaction,
+        log id) order and only once settled, so a transaction that commits
+        late is served after the cursor, not skipped behind it.
+        `categories` has the current row of every category they mention
+        (deleted ones are absent), so replaying a page twice is harmless.
+        """
+        settled = CategoryChange.objects.settled()
+        since = request.query_params.get('since')
+        try:
+            page_size = min(int(request.query_params.get('page_size', CHANGES_PAGE_SIZE)), CHANGES_MAX_PAGE_SIZE)
+            if since == 'latest':
+                since = settled.order_by('-txid', '-id').values_list('txid', 'id').first() or (0, 0)
+            else:
+                since = decode_cursor(since) or (0, 0)
+            if not isinstance(since[0], int) or page_size < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"error": "since must be a cursor or 'latest', page_size a positive integer."}, status=400)
+
+        txid, last_id = since
+        changes = list(
+            settled.filter(Q(txid__gt=txid) | Q(txid=txid, id__gt=last_id)).order_by('txid', 'id')
+            .values('txid', 'id', 'action', 'category_id', 'ref_id', 'created_at')[:page_size + 1]
+        )
+        more = len(changes) > page_size
+        changes = changes[:page_size]
+        if changes:
+            since = (changes[-1]['txid'], changes[-1]['id'])
+        cursor = encode_cursor(*since)
+        next_url = replace_query_param(request.build_absolute_uri(), 'since', cursor) if more else None
+        for change in changes:
+            del change['txid']
+
+        mentioned = {change['category_id'] for change in changes if change['action'] != CategoryChange.Action.DELETE}
+        categories = Category.objects.filter(pk__in=mentioned).order_by('id').values(*TREE_FIELDS)
+        return Response({
+            'cursor': cursor,
+            'changes': changes,
+            'categories': list(categories),
+            'next': next_url,
+        })
+
+    @extend_schema(
+        summary="Shortest similarity chain (rabbit hole) between two categories",
+        parameters=[
+            OpenApiParameter('max_hops', int, required=False,
+                             description="Give up beyond this many links (capped by PATH_MAX_HOPS)"),
+            OpenApiParameter('timeout', float, required=False,
+                             description="Seconds to search (capped by PATH_QUERY_TIMEOUT)"),
+        ],
+    )
+    @decorators.action(detail=True, methods=['get'], url_path=r'path/(?P<target>[0-9]+)')
+    def path(self, request, pk=None, target=None):
+        """
+        Bidirectional BFS over the shared memory-mapped snapshot when it is
+        current, otherwise straight against the through-table: one query per
+        BFS layer, expanding whichever end has the smaller frontier.
+        """
+        source = get_object_or_404(Category, pk=pk).pk
+        target = get_object_or_404(Category, pk=target).pk
+        try:
+            max_hops = min(int(request.query_params.get('max_hops', settings.PATH_MAX_HOPS)), settings.PATH_MAX_HOPS)
+            timeout = min(float(request.query_params.get('timeout', settings.PATH_QUERY_TIMEOUT)), settings.PATH_QUERY_TIMEOUT)
+        except ValueError:
+            return Response({"error": "max_hops and timeout must be numbers."}, status=400)
+
+        try:
+            path = find_similarity_path(source, target, max_hops, timeout)
+        except PathSearchTimeout:
+            return Response({"error": f"No path found within {timeout}s."}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+        if path is None:
+            return Response({"error": f"No path within {max_hops} hops."}, status=404)
+
+        names = dict(Category.objects.filter(pk__in=path).values_list('id', 'name'))
+        return Response({
+            "hops": len(path) - 1,
+            "path": [{"id": nid, "name": names.get(nid)} for nid in path],
+        })
+
+    @extend_schema(
+        summary="Similarity island of a category (from the last analyze_rabbits run)",
+        responses={200: SimilarityComponentSerializer},
+    )
+    @decorators.action(detail=True, methods=['get'])
+    def component(self, request, pk=None):
+        component = get_object_or_404(SimilarityComponent, members__category_id=pk)
+        return Response(SimilarityComponentSerializer(component).data)
+
+    @extend_schema(summary="Longest rabbit hole found by the last analyze_rabbits run")
+    @decorators.action(detail=False, methods=['get'], url_path='rabbit-hole')
+    def rabbit_hole(self, request):
+        best = SimilarityComponent.objects.order_by('-diameter_estimate', 'id').first()
+        if best is None:
+            return Response({"error": "No analysis stored yet. Run analyze_rabbits."}, status=404)
+        names = dict(Category.objects.filter(pk__in=best.longest_path).values_list('id', 'name'))
+        data = SimilarityComponentSerializer(best).data
+        data['path'] = [{'id': nid, 'name': names.get(nid)} for nid in best.longest_path]
+        return Response(data)
+
 
 # A special "Admin-like" view to see the diagram
 @staff_member_required
 def admin_tree_view(request):
     """
-    Renders a D3.js or simple HTML list of the hierarchy
+    Renders an expandable HTML list of the hierarchy. Only the shell is
+    served here; levels are fetched on demand from admin_tree_children,
+    so the page weight depends on what is open, not on the table size.
+    """
+    return render(request, 'admin/category_tree.html', {'page_size': ADMIN_TREE_PAGE_SIZE})
+
+
+@staff_member_required
+def admin_tree_children(request):
+    """
+    One page of children of ?parent= (roots when omitted), keyset-paged
+    by id with ?after=. child_count tells the page which nodes expand.
+    """
+    try:
+        parent = int(request.GET['parent']) if request.GET.get('parent') else None
+        after = int(request.GET.get('after', 0))
+        limit = min(int(request.GET.get('limit', ADMIN_TREE_PAGE_SIZE)), ADMIN_TREE_PAGE_SIZE * 10)
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({"error": "parent, after and limit must be integers."}, status=400)
+
+    rows = list(
+        Category.objects.filter(parent_id=parent, id__gt=after)
+        .order_by('id').values('id', 'name', 'child_count')[:limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return JsonResponse({'results': rows, 'next': rows[-1]['id'] if more else None})
+
+
+@staff_member_required
+def admin_tree_search(request):
     """
-    # Optimized fetch of just the structure
-    categories = Category.objects.all().values('id', 'name', 'parent_id')
-    return render(request, 'admin/category_tree.html', {'categories': list(categories)})
\ No newline at end of file
+    Name matches with their ancestor chain (read off the path index), so
+    the page can open the tree straight down to each hit.
+    """
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'results': []})
+
+    matches = list(
+        Category.objects.filter(name__icontains=query)
+        .order_by('depth', 'id').only('id', 'name', 'path', 'child_count')[:ADMIN_TREE_SEARCH_LIMIT]
+    )
+    ancestors = Category.objects.only('id', 'name', 'child_count').in_bulk(
+        {pk for match in matches for pk in match.ancestor_ids}
+    )
+    results = []
+    for match in matches:
+        chain = [ancestors[pk] for pk in match.ancestor_ids if pk in ancestors] + [match]
+        results.append({
+            'id': match.id,
+            'chain': [{'id': c.id, 'name': c.name, 'child_count': c.child_count} for c in chain],
+        })
+    return JsonResponse({'results': results})
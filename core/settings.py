@@ -63,6 +63,8 @@ SPECTACULAR_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    # First, so it sees every query and the full latency
+    'categories.middleware.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,7 +79,7 @@ ROOT_URLCONF = 'core.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -100,6 +102,55 @@ DATABASES = {
     'default': env.db('DATABASE_URL')
 }
 
+# Connection reuse. DB_POOL=1 (PostgreSQL on psycopg 3) gives each worker
+# process a connection pool; that is the only reuse that works under the
+# ASGI workers (SERVER_MODE=asgi, see entrypoint.sh), where every request
+# runs in a new thread and persistent connections would pile up towards
+# max_connections. So without a pool CONN_MAX_AGE defaults to 0 under
+# ASGI; under WSGI each worker thread keeps its connection for 60s,
+# checked before reuse when CONN_HEALTH_CHECKS is set.
+SERVER_MODE = env('SERVER_MODE', default='asgi')
+if env.bool('DB_POOL', default=False) and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+        'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+        # Seconds a request waits for a free connection
+        'timeout': env.float('DB_POOL_TIMEOUT', default=5.0),
+        'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=600.0),
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = env.int('CONN_MAX_AGE', default=0 if SERVER_MODE == 'asgi' else 60)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = env.bool('CONN_HEALTH_CHECKS', default=True)
+
+
+# Cache
+# Local memory by default, so each worker renders and keeps its own tree.
+# The versions the payloads are keyed on live in the database (see
+# categories/cache.py), so workers never serve each other's stale trees;
+# a shared CACHE_URL only saves the re-renders.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://')
+}
+
+# Seconds a rendered /api/categories/tree/ payload stays cached
+TREE_CACHE_TIMEOUT = env.int('TREE_CACHE_TIMEOUT', default=3600)
+
+# Limits for /api/categories/{id}/path/{target}/ - keep the timeout well
+# under the 10s gunicorn/nginx budget
+PATH_MAX_HOPS = env.int('PATH_MAX_HOPS', default=12)
+PATH_QUERY_TIMEOUT = env.float('PATH_QUERY_TIMEOUT', default=5.0)
+
+# Directory for the memory-mapped similarity graph shared by all workers
+# (see categories/snapshot.py). Unset = always read the database.
+SIMILARITY_SNAPSHOT_DIR = env('SIMILARITY_SNAPSHOT_DIR', default=None)
+
+# Request instrumentation (categories/middleware.py): log requests running
+# more queries than this; serve Prometheus counters at /api/metrics/
+QUERY_BUDGET = env.int('QUERY_BUDGET', default=50)
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=False)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -16,11 +16,22 @@ python manage.py collectstatic --noinput
 
 # Start Gunicorn
 # -w 4: 4 Worker processes (Optimized for standard 2-core cloud instances)
+# -k: Uvicorn (ASGI) workers, so the async read views (/api/async/...) share
+#     each process between many concurrent requests; sync views still run
+#     in a thread per request. Set SERVER_MODE=wsgi for the old sync workers.
 # -b: Bind address
 echo "Starting Gunicorn..."
 
 # Start Gunicorn with a timeout that matches Nginx
-exec gunicorn core.wsgi:application \
+if [ "${SERVER_MODE:-asgi}" = "wsgi" ]; then
+    exec gunicorn core.wsgi:application \
+        --workers 4 \
+        --timeout 10 \
+        --bind 0.0.0.0:8000
+fi
+
+exec gunicorn core.asgi:application \
+    --worker-class uvicorn_worker.UvicornWorker \
     --workers 4 \
     --timeout 10 \
-    --bind 0.0.0.0:8000
\ No newline at end of file
+    --bind 0.0.0.0:8000